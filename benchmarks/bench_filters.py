@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Time every registered WallpaperFilter, and the old per-pixel sepia for comparison
+
+    python -m benchmarks.bench_filters [--size 1920x1080] [--repeat 3]
+"""
+from argparse import ArgumentParser
+import itertools
+import time
+
+from PIL import Image
+
+from wallpaper.filters.wallpaper_filter import WallpaperFilter
+from wallpaper.geom.point import Point
+from wallpaper.geom.size import Size
+from wallpaper.monitor.render import TileMonitor
+
+
+def legacy_sepia(image: Image.Image) -> Image.Image:
+    """
+    The per-pixel Sepia filter, kept as a reference point
+    """
+    width, height = image.size
+    pixels = image.load()
+    for py, px in itertools.product(range(height), range(width)):
+        r, g, b, a = image.getpixel((px, py))
+        tr = min(255, int(0.393 * r + 0.769 * g + 0.189 * b))
+        tg = min(255, int(0.349 * r + 0.686 * g + 0.168 * b))
+        tb = min(255, int(0.272 * r + 0.534 * g + 0.131 * b))
+        pixels[px, py] = (tr, tg, tb, a)
+    return image
+
+
+def sample_image(size: tuple[int, int]) -> Image.Image:
+    gradient = Image.linear_gradient('L').resize(size)
+    return Image.merge('RGBA', (gradient, gradient.transpose(Image.Transpose.FLIP_TOP_BOTTOM),
+                                gradient.transpose(Image.Transpose.ROTATE_180), Image.new('L', size, 255)))
+
+
+def time_call(fn, image: Image.Image, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        source = image.copy()
+        start = time.perf_counter()
+        fn(source)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_filters(size: tuple[int, int], repeat: int) -> dict[str, float]:
+    image = sample_image(size)
+    monitor = TileMonitor(Size(*size), 0)
+    results = {}
+    for name in WallpaperFilter.list_filters():
+        image_filter = WallpaperFilter.get_filter(name)
+        results[name] = time_call(lambda i: image_filter(i, monitor, Point(0, 0)), image, repeat)
+    return results
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--size', default='1920x1080', help='Image size, WxH')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-legacy', dest='legacy', action='store_false', help='Skip the slow per-pixel sepia')
+    options = parser.parse_args()
+    size = tuple(int(v) for v in options.size.lower().split('x'))
+
+    results = bench_filters(size, options.repeat)
+    for name, seconds in results.items():
+        print(f'{name:20} {seconds * 1000:10.2f} ms')
+    if options.legacy:
+        legacy = time_call(legacy_sepia, sample_image(size), 1)
+        print(f'{"legacy sepia":20} {legacy * 1000:10.2f} ms  ({legacy / results["sepia"]:.0f}x slower)')
+
+
+if __name__ == '__main__':
+    main()
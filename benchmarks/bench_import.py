@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Time startup: importing main and picking the desktop backend, each run in a fresh interpreter
+
+    python -m benchmarks.bench_import [--repeat 5] [--budget-ms 200] [--top 15]
+
+Exits non-zero if the best run is over budget, or if startup imports something it should leave until it's used.
+"""
+from argparse import ArgumentParser
+import json
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP = """
+import json, sys, time
+start = time.perf_counter()
+import main
+main.get_desktop_class('headless')
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed, 'modules': sorted(sys.modules)}))
+"""
+
+# Only needed once a particular feature or platform is in use
+LAZY_MODULES = (
+    'tkinter',
+    'multiprocessing',
+    'concurrent.futures.process',
+    'platform',
+    'wallpaper.monitor.generic',
+    'wallpaper.monitor.windows',
+    'wallpaper.monitor.osx',
+    'wallpaper.desktop.windows_desktop',
+    'wallpaper.desktop.osx_desktop',
+    'wallpaper.filters.border',
+    'wallpaper.filters.fade_to_grey',
+    'wallpaper.filters.sepia',
+    'wallpaper.filters.tunnel',
+    'PIL.JpegImagePlugin',
+    'PIL.PngImagePlugin',
+)
+
+
+def run_startup(importtime: bool = False) -> tuple[dict, str]:
+    command = [sys.executable, *(['-X', 'importtime'] if importtime else []), '-c', STARTUP]
+    result = subprocess.run(command, capture_output=True, text=True, check=True, cwd=ROOT)
+    return json.loads(result.stdout), result.stderr
+
+
+def slowest_imports(importtime_log: str, top: int) -> list[tuple[int, str]]:
+    """
+    The `top` modules by cumulative import time, in microseconds
+    """
+    imports = []
+    for line in importtime_log.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \|(\s*)(\S+)', line)
+        if match:
+            imports.append((int(match.group(1)), match.group(3)))
+    return sorted(imports, reverse=True)[:top]
+
+
+def unexpected_modules(modules: list[str]) -> list[str]:
+    return [m for m in LAZY_MODULES if m in modules]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = ArgumentParser(description='Startup time benchmark')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=200, help='Fail if the best startup is slower than this')
+    parser.add_argument('--top', type=int, default=15, help='Show this many of the slowest imports')
+    options = parser.parse_args(argv)
+
+    timings = [run_startup()[0]['seconds'] for _ in range(options.repeat)]
+    result, log = run_startup(importtime=True)
+    best = min(timings) * 1000
+    print(f'Startup: best {best:.1f} ms, worst {max(timings) * 1000:.1f} ms over {options.repeat} runs '
+          f'(budget {options.budget_ms:.0f} ms)')
+    print('Slowest imports (cumulative):')
+    for microseconds, module in slowest_imports(log, options.top):
+        print(f'  {microseconds / 1000:8.1f} ms  {module}')
+
+    failed = False
+    eager = unexpected_modules(result['modules'])
+    if eager:
+        print(f'Imported at startup but only needed later: {", ".join(eager)}')
+        failed = True
+    if best > options.budget_ms:
+        print('Over budget')
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Render whole wallpapers headless against a synthetic library and report how they scale
+
+    python -m benchmarks.scaling [--library DIR | --count 1000 --fan-out 4 --depth 2 --formats jpeg,rgba]
+                                 [--monitors 1920x1080,2560x1440] [--wallpapers 3]
+                                 [--fill-modes strip,spiral,swatch,collage] [--set stack_mode=true] [-o results.json]
+
+Each fill mode runs in its own process so peak RSS is per mode. Reports wall time, time per stage
+(see wallpaper.tools.perf) and images opened, per wallpaper.
+"""
+from argparse import ArgumentParser, Namespace
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from wallpaper.config import WallpaperConfig
+from wallpaper.desktop.headless_desktop import HeadlessDesktop
+from wallpaper.tools import directory_tools
+from wallpaper.tools.perf import Counters
+from .suite import parse_size, working_directory
+from .synth_library import Formats, generate, parse_sizes
+
+
+def peak_rss() -> int | None:
+    """
+    Peak resident set size of this process in bytes, where the platform tells us
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def parse_setting(value: str) -> tuple[str, object]:
+    name, _, raw = value.partition('=')
+    try:
+        return name, json.loads(raw)
+    except json.JSONDecodeError:
+        return name, raw
+
+
+def worker(options: Namespace) -> dict:
+    """
+    Render the wallpapers for one fill mode, in this process
+    """
+    layout, left = [], 0
+    for width, height in options.monitors:
+        layout.append([left, 0, left + width, height])
+        left += width
+    config = WallpaperConfig()
+    config.global_config.update({
+        'fill_mode': options.fill_mode,
+        'directories': [f'+{os.path.abspath(options.library)}'],
+        'virtual_monitors': layout,
+        'output_file': 'wallpaper.jpg',
+        **dict(options.settings),
+    })
+    wallpapers = []
+    with tempfile.TemporaryDirectory() as work, working_directory(work):
+        for _ in range(options.wallpapers):
+            Counters.reset()
+            # Each run of the real thing is a fresh process
+            directory_tools.chosen.clear()
+            start = time.perf_counter()
+            HeadlessDesktop(config).generate_wallpaper()
+            wall_time = time.perf_counter() - start
+            wallpapers.append({'seconds': wall_time, 'bytes': os.path.getsize('wallpaper.jpg'), **Counters.snapshot()})
+    return {'fill_mode': options.fill_mode, 'peak_rss': peak_rss(), 'wallpapers': wallpapers}
+
+
+def run(options: Namespace, library: str) -> dict:
+    modes = {}
+    for fill_mode in options.fill_modes:
+        print(f'Rendering {fill_mode}', file=sys.stderr)
+        command = [sys.executable, '-m', 'benchmarks.scaling', '--worker', '--library', library,
+                   '--fill-mode', fill_mode, '--wallpapers', str(options.wallpapers),
+                   '--monitors', ','.join(f'{w}x{h}' for w, h in options.monitors)]
+        for name, value in options.settings:
+            command += ['--set', f'{name}={json.dumps(value)}']
+        result = subprocess.run(command, capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        modes[fill_mode] = json.loads(result.stdout)
+    return {
+        'library': library,
+        'monitors': [list(size) for size in options.monitors],
+        'settings': dict(options.settings),
+        'modes': modes,
+    }
+
+
+def report(results: dict) -> str:
+    lines = []
+    for fill_mode, mode in results['modes'].items():
+        wallpapers = mode['wallpapers']
+        rss = mode['peak_rss']
+        lines.append(f'{fill_mode}: peak RSS {rss / 2 ** 20:.0f} MB' if rss else f'{fill_mode}:')
+        for i, wallpaper in enumerate(wallpapers):
+            stages = ', '.join(f'{stage} {s["seconds"]:.3f}s' for stage, s in sorted(wallpaper['stages'].items()))
+            canvas = wallpaper.get('peaks', {}).get('canvas_bytes', 0)
+            lines.append(f'  #{i} {wallpaper["seconds"]:.3f}s, '
+                         f'{wallpaper["counts"].get("images_opened", 0)} images opened, '
+                         f'peak canvas {canvas / 2 ** 20:.1f} MB; {stages}')
+    return '\n'.join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = ArgumentParser(description='End to end wallpaper rendering benchmark')
+    parser.add_argument('--library', help='An existing image library, instead of generating one')
+    parser.add_argument('--count', type=int, default=1000, help='Images to generate')
+    parser.add_argument('--fan-out', type=int, default=4)
+    parser.add_argument('--depth', type=int, default=2)
+    parser.add_argument('--formats', type=lambda v: v.split(','), default=['jpeg'], help=f'Any of {list(Formats)}')
+    parser.add_argument('--sizes', type=parse_sizes, default=[(1920, 1080), (1080, 1920), (800, 600)],
+                        help='Generated image sizes, comma separated WxH')
+    parser.add_argument('--monitors', type=lambda v: [parse_size(s) for s in v.split(',')], default=[(1920, 1080)],
+                        help='Monitor sizes, comma separated WxH, laid out left to right')
+    parser.add_argument('--wallpapers', type=int, default=3, help='Wallpapers to render per fill mode')
+    parser.add_argument('--fill-modes', type=lambda v: v.split(','), default=['strip', 'spiral', 'swatch', 'collage'])
+    parser.add_argument('--set', dest='settings', type=parse_setting, action='append', default=[],
+                        help='Config override, name=json value')
+    parser.add_argument('--output', '-o', help='Also write JSON results here')
+    parser.add_argument('--worker', action='store_true', help='Internal: render one fill mode and print JSON')
+    parser.add_argument('--fill-mode', help='Internal: the fill mode for --worker')
+    options = parser.parse_args(argv)
+
+    if options.worker:
+        print(json.dumps(worker(options)))
+        return 0
+
+    with tempfile.TemporaryDirectory() as root:
+        library = options.library
+        if not library:
+            library = os.path.join(root, 'library')
+            print(f'Generating {options.count} images', file=sys.stderr)
+            generate(library, options.count, options.fan_out, options.depth, options.formats, options.sizes)
+        results = run(options, library)
+
+    print(report(results))
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+Time the layout, selection, compositing, encoding and filter hot paths. Runs headless, nothing touches the display.
+
+    python -m benchmarks.suite run [--output results.json] [--only swatch] [--repeat 5] [--files 1000,10000,100000]
+    python -m benchmarks.suite compare baseline.json results.json [--threshold 0.1]
+
+`compare` exits non-zero if anything got slower than the threshold allows.
+"""
+from argparse import ArgumentParser, Namespace
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable
+
+import PIL
+from PIL import Image
+
+from wallpaper.config import MonitorConfig
+from wallpaper.geom.point import Point
+from wallpaper.geom.rect import Rect
+from wallpaper.geom.size import Size
+from wallpaper.monitor.monitor import Monitor
+from wallpaper.monitor.monitor_rect import MonitorRect
+from wallpaper.tools import directory_tools
+from wallpaper.tools.encoder import Encoder, Formats
+from .bench_filters import bench_filters, sample_image
+
+Benchmarks: dict[str, Callable[[Namespace], dict[str, dict]]] = {}
+
+
+def benchmark(fn: Callable[[Namespace], dict[str, dict]]) -> Callable[[Namespace], dict[str, dict]]:
+    Benchmarks[fn.__name__] = fn
+    return fn
+
+
+def best_of(fn: Callable, repeat: int, number: int = 1, setup: Callable[[], tuple] | None = None) -> dict:
+    """
+    Best per call time over `repeat` runs of `number` calls. `setup` makes fresh arguments for each call, untimed.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        elapsed = 0.0
+        for _ in range(number):
+            args = setup() if setup else ()
+            start = time.perf_counter()
+            fn(*args)
+            elapsed += time.perf_counter() - start
+        best = min(best, elapsed / number)
+    return {'seconds': best, 'repeat': repeat, 'number': number}
+
+
+def headless_monitor(size: tuple[int, int], **config) -> Monitor:
+    """
+    A Monitor that isn't attached to a display or an image library
+    """
+    rect = MonitorRect(0, 0, *size)
+    monitor = Monitor('Benchmark', rect, rect, 1, 0)
+    monitor.config = MonitorConfig(**config)
+    monitor.rng = random.Random(0)
+    return monitor
+
+
+@contextlib.contextmanager
+def working_directory(path: str):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield path
+    finally:
+        os.chdir(previous)
+
+
+def make_library(root: str, count: int) -> str:
+    """
+    A directory of `count` images, hard links to one small JPEG where the filesystem allows
+    """
+    directory = os.path.join(root, f'lib{count}')
+    os.makedirs(directory)
+    source = os.path.join(root, 'source.jpg')
+    if not os.path.exists(source):
+        sample_image((320, 200)).convert('RGB').save(source)
+    for i in range(count):
+        target = os.path.join(directory, f'{i:06d}.jpg')
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copyfile(source, target)
+    return directory
+
+
+@benchmark
+def layout(options: Namespace) -> dict[str, dict]:
+    monitor = headless_monitor(options.size)
+    return {
+        'layout.build_swatches': best_of(monitor.build_swatches, options.repeat, 100),
+        'layout.build_spiral': best_of(lambda: list(monitor.build_spiral()), options.repeat, 100),
+        'layout.make_strips': best_of(monitor.make_strips, options.repeat, 100),
+    }
+
+
+@benchmark
+def rect(options: Namespace) -> dict[str, dict]:
+    rng = random.Random(0)
+    width, height = options.size
+
+    def random_rect() -> Rect:
+        x, y = rng.randrange(width), rng.randrange(height)
+        return Rect(Point(x, y), Size(rng.randint(1, width - x), rng.randint(1, height - y)))
+
+    pairs = [(random_rect(), random_rect()) for _ in range(1000)]
+
+    def differences():
+        for a, b in pairs:
+            a - b
+
+    return {'rect.difference': best_of(differences, options.repeat)}
+
+
+@benchmark
+def selection(options: Namespace) -> dict[str, dict]:
+    results = {}
+    with tempfile.TemporaryDirectory() as root, working_directory(root):
+        directory_tools.expand_dirs_lite([])
+        history = directory_tools.FileCache.history
+        for count in options.files:
+            directory = make_library(root, count)
+            files = directory_tools.FileCache.get(directory).files
+            results[f'selection.get_available.{count}'] = best_of(
+                lambda: history.get_available(files, set()), options.repeat, 10
+            )
+
+            def reset():
+                directory_tools.chosen.clear()
+                history.directories.clear()
+                history.newWalls.clear()
+                directory_tools.Pools.clear()
+                return ()
+
+            results[f'selection.get_new_image.{count}'] = best_of(
+                lambda: directory_tools.get_new_image(directory).close(), options.repeat, 10, reset
+            )
+            # Later picks from the same directory, which draw from its unseen pool rather than the whole listing
+            reset()
+            directory_tools.get_new_image(directory).close()
+            results[f'selection.get_new_image.warm.{count}'] = best_of(
+                lambda: directory_tools.get_new_image(directory).close(), options.repeat, 10
+            )
+        directory_tools.chosen.clear()
+    return results
+
+
+@benchmark
+def compositing(options: Namespace) -> dict[str, dict]:
+    results = {}
+    tile = sample_image((640, 480))
+    for blending in (False, True):
+        monitor = headless_monitor(options.size, blending=blending, image_filters=[])
+        monitor.bg_image = Image.new('RGB', tuple(options.size), (64, 64, 64))
+        name = 'compositing.put_image_at' + ('.blend' if blending else '')
+        results[name] = best_of(
+            monitor.put_image_at, options.repeat, 10,
+            lambda: (tile.copy(), Point(100, 100), Size(960, 720), Image.Resampling.LANCZOS)
+        )
+    return results
+
+
+@benchmark
+def encoding(options: Namespace) -> dict[str, dict]:
+    results = {}
+    canvas = sample_image(tuple(options.size)).convert('RGB')
+    with tempfile.TemporaryDirectory() as root:
+        for image_format, extension in Formats.items():
+            encoder = Encoder(image_format)
+            path = os.path.join(root, f'wallpaper{extension}')
+
+            def forget():
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(f'{path}.digest')
+                return ()
+
+            results[f'encode.{image_format.lower()}'] = best_of(lambda: encoder.write(canvas, path), options.repeat,
+                                                                1, forget)
+            results[f'encode.{image_format.lower()}']['bytes'] = os.path.getsize(path)
+        results['encode.unchanged'] = best_of(lambda: encoder.write(canvas, path), options.repeat)
+    return results
+
+
+@benchmark
+def filters(options: Namespace) -> dict[str, dict]:
+    return {
+        f'filter.{name}': {'seconds': seconds, 'repeat': options.repeat, 'number': 1}
+        for name, seconds in bench_filters(tuple(options.size), options.repeat).items()
+    }
+
+
+def run(options: Namespace) -> dict:
+    results = {}
+    for name, fn in Benchmarks.items():
+        if options.only and not any(o in name for o in options.only):
+            continue
+        print(f'Running {name}', file=sys.stderr)
+        results.update(fn(options))
+    return {
+        'meta': {
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'pillow': PIL.__version__,
+            'platform': platform.platform(),
+            'size': list(options.size),
+            'files': options.files,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> tuple[list[str], list[str]]:
+    """
+    Compare two result sets
+
+    :return: A report line per benchmark, and the names of those that regressed by more than `threshold`
+    """
+    lines, regressions = [], []
+    old, new = baseline['results'], current['results']
+    for name in sorted(old.keys() | new.keys()):
+        if name not in new:
+            lines.append(f'{name:40} {"missing":>12}')
+            continue
+        if name not in old:
+            lines.append(f'{name:40} {"":>12} {new[name]["seconds"] * 1000:12.3f} ms  new')
+            continue
+        before, after = old[name]['seconds'], new[name]['seconds']
+        ratio = after / before if before else float('inf')
+        note = ''
+        if ratio > 1 + threshold:
+            note = 'SLOWER'
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            note = 'faster'
+        lines.append(f'{name:40} {before * 1000:12.3f} {after * 1000:12.3f} ms  {ratio:6.2f}x {note}')
+    return lines, regressions
+
+
+def parse_size(value: str) -> tuple[int, int]:
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run the benchmarks and write JSON results')
+    run_parser.add_argument('--output', '-o', help='Results file (default stdout)')
+    run_parser.add_argument('--only', action='append', help=f'Only run benchmarks matching this, of {list(Benchmarks)}')
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--size', type=parse_size, default=(1920, 1080), help='Monitor size, WxH')
+    run_parser.add_argument('--files', type=lambda v: [int(c) for c in v.split(',')], default=[1000, 10000, 100000],
+                            help='Library sizes for the selection benchmarks, comma separated')
+
+    compare_parser = commands.add_parser('compare', help='Compare results against a baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help='Allowed slow down (default 0.1, 10%%)')
+
+    options = parser.parse_args(argv)
+    if options.command == 'run':
+        results = json.dumps(run(options), indent=2)
+        if options.output:
+            with open(options.output, 'w') as f:
+                f.write(results)
+        else:
+            print(results)
+        return 0
+
+    with open(options.baseline) as f:
+        baseline = json.load(f)
+    with open(options.current) as f:
+        current = json.load(f)
+    lines, regressions = compare(baseline, current, options.threshold)
+    print('\n'.join(lines))
+    if regressions:
+        print(f'{len(regressions)} regression(s): {", ".join(regressions)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
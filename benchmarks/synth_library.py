@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Generate a synthetic image library to benchmark against
+
+    python -m benchmarks.synth_library ROOT [--count 1000] [--fan-out 4] [--depth 2]
+                                             [--formats jpeg,png,rgba] [--sizes 1920x1080,1080x1920,800x600]
+"""
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+import os
+import random
+from typing import Sequence
+
+from PIL import Image
+
+# name: (extension, save format, mode)
+Formats = {
+    'jpeg': ('.jpg', 'JPEG', 'RGB'),
+    'png': ('.png', 'PNG', 'RGB'),
+    'rgba': ('.png', 'PNG', 'RGBA'),
+}
+
+
+def make_directories(root: str, fan_out: int, depth: int) -> list[str]:
+    """
+    A tree `depth` levels deep with `fan_out` sub directories at each level. Returns every directory, root first.
+    """
+    directories = [root]
+    level = [root]
+    for d in range(depth):
+        level = [os.path.join(parent, f'd{d}_{i}') for parent in level for i in range(fan_out)]
+        directories.extend(level)
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+    return directories
+
+
+def synth_image(size: tuple[int, int], mode: str, rng: random.Random) -> Image.Image:
+    """
+    A cheap image with some structure: tinted gradients, so it compresses like a photo more than flat colour does
+    """
+    gradient = Image.linear_gradient('L')
+    bands = [gradient.rotate(rng.choice((0, 90, 180, 270))).point(lambda v, s=rng.uniform(0.3, 1.0): int(v * s))
+             for _ in range(3)]
+    if mode == 'RGBA':
+        bands.append(Image.radial_gradient('L').point(lambda v: 255 - v))
+    return Image.merge(mode, bands).resize(size, Image.Resampling.BILINEAR)
+
+
+def generate(root: str, count: int, fan_out: int = 4, depth: int = 2, formats: Sequence[str] = ('jpeg',),
+             sizes: Sequence[tuple[int, int]] = ((1920, 1080),), jitter: float = 0.2, seed: int = 0) -> list[str]:
+    """
+    Write `count` images spread evenly over a directory tree under `root`
+
+    :param fan_out: Sub directories per directory
+    :param depth: Levels of sub directories
+    :param formats: Keys of `Formats`, used in turn
+    :param sizes: Base (width, height) sizes, used in turn
+    :param jitter: Vary each dimension by up to this fraction
+    :param seed: Seed for sizes and content, the same arguments give the same library
+    :return: The files written
+    """
+    directories = make_directories(root, fan_out, depth)
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(count):
+        extension, image_format, mode = Formats[formats[i % len(formats)]]
+        width, height = sizes[i % len(sizes)]
+        size = (max(1, int(width * rng.uniform(1 - jitter, 1 + jitter))),
+                max(1, int(height * rng.uniform(1 - jitter, 1 + jitter))))
+        path = os.path.join(directories[i % len(directories)], f'img{i:07d}{extension}')
+        jobs.append((path, size, image_format, mode, rng.random()))
+
+    def write(job):
+        path, size, image_format, mode, image_seed = job
+        synth_image(size, mode, random.Random(image_seed)).save(path, image_format)
+        return path
+
+    # Encoding releases the GIL, so threads help here
+    with ThreadPoolExecutor() as executor:
+        return list(executor.map(write, jobs))
+
+
+def parse_sizes(value: str) -> list[tuple[int, int]]:
+    return [tuple(int(v) for v in size.lower().split('x')) for size in value.split(',')]
+
+
+def main(argv: list[str] | None = None):
+    parser = ArgumentParser(description='Generate a synthetic image library')
+    parser.add_argument('root')
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--fan-out', type=int, default=4, help='Sub directories per directory')
+    parser.add_argument('--depth', type=int, default=2, help='Levels of sub directories')
+    parser.add_argument('--formats', type=lambda v: v.split(','), default=['jpeg'], help=f'Any of {list(Formats)}')
+    parser.add_argument('--sizes', type=parse_sizes, default=[(1920, 1080)], help='Comma separated WxH')
+    parser.add_argument('--jitter', type=float, default=0.2, help='Vary sizes by up to this fraction')
+    parser.add_argument('--seed', type=int, default=0)
+    options = parser.parse_args(argv)
+    files = generate(options.root, options.count, options.fan_out, options.depth, options.formats, options.sizes,
+                     options.jitter, options.seed)
+    print(f'Wrote {len(files)} images under {options.root}')
+
+
+if __name__ == '__main__':
+    main()
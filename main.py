@@ -7,11 +7,10 @@ import random
 import sys
 import tempfile
 
-if sys.platform == 'darwin':
-    from wallpaper.desktop.osx_desktop import OSX_Desktop as Desktop
-else:
-    from wallpaper.desktop.windows_desktop import WindowsDesktop as Desktop
 from wallpaper.config import WallpaperConfig
+from wallpaper.daemon import Daemon
+from wallpaper.desktop import get_desktop_class
+from wallpaper.monitor.virtual import parse_monitor
 
 
 class Wallpaper:
@@ -23,12 +22,28 @@ class Wallpaper:
         self.config = None
         random.seed()
 
-    def get_config_file_options(self, options):
-        config_file = 'pywallpaper.json'
-        if options.config_file:
-            config_file = options.config_file
+    @staticmethod
+    def get_config_file(options) -> str:
+        return options.config_file or 'pywallpaper.json'
+
+    def get_config_file_options(self, options) -> WallpaperConfig:
         self.config = WallpaperConfig()
-        self.config.load(open(config_file, 'rt', encoding='utf-8'))
+        with open(self.get_config_file(options), 'rt', encoding='utf-8') as fp:
+            self.config.load(fp)
+        if options.seed is not None:
+            self.config.set_option('seed', options.seed)
+        if options.output_file:
+            self.config.set_option('desktop_backend', 'headless')
+            self.config.set_option('output_file', options.output_file)
+        if options.monitors:
+            self.config.set_option('virtual_monitors', [list(m) for m in options.monitors])
+        if options.interval is not None:
+            self.config.set_option('daemon_interval', options.interval)
+        if options.refresh_monitors:
+            self.config.set_option('refresh_monitors', options.refresh_monitors)
+        if options.refresh_regions:
+            self.config.set_option('refresh_regions', options.refresh_regions)
+        return self.config
 
     @staticmethod
     def get_command_line_options():
@@ -41,6 +56,21 @@ class Wallpaper:
                             help='path to alternate config file (default <working dir>/pywallpaper.conf)')
         parser.add_argument('--working-dir', '-w', dest='cwd', default='.', help='Working Directory (default .)')
         parser.add_argument('--single_image', help='single image to set as wallpaper', default=None)
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Seed the layout, image choice and filters so runs are reproducible')
+        parser.add_argument('--headless', dest='output_file', default=None,
+                            help='Render to this file without a display, instead of setting the wallpaper')
+        parser.add_argument('--monitor', dest='monitors', default=[], action='append', type=parse_monitor,
+                            help='Add a virtual monitor for --headless, WIDTHxHEIGHT[@LEFT,TOP]')
+        parser.add_argument('--daemon', action='store_true',
+                            help='Stay running and make a new wallpaper every interval, or when pywallpaper.trigger '
+                                 'is created')
+        parser.add_argument('--interval', type=int, default=None,
+                            help='Seconds between wallpapers with --daemon (default 900)')
+        parser.add_argument('--refresh-monitor', dest='refresh_monitors', default=[], action='append', type=int,
+                            help='Only redo this monitor, over the current wallpaper')
+        parser.add_argument('--refresh-regions', type=int, default=0,
+                            help='Only redo this many strips or swatches on each monitor, over the current wallpaper')
         return parser.parse_args()
 
     def go(self):
@@ -52,14 +82,25 @@ class Wallpaper:
                 os.chdir(pathlib.Path(sys.argv[0]).parent)
                 logging.info('Starting: %s', os.getcwd())
         self.get_config_file_options(options)
-        desktop = Desktop(self.config)
+        if self.config.global_config.seed is not None:
+            random.seed(self.config.global_config.seed)
+        if options.daemon:
+            Daemon(self.get_config_file(options), lambda: self.get_config_file_options(options)).run()
+            return
+        desktop = get_desktop_class(self.config.global_config.desktop_backend)(self.config)
+        config = self.config.global_config
         if options.single_image:
             desktop.set_wallpaper_from_image(options.single_image)
+        elif config.refresh_monitors or config.refresh_regions:
+            desktop.refresh_wallpaper(config.refresh_monitors, config.refresh_regions)
         else:
             desktop.generate_wallpaper()
 
 
 if __name__ == '__main__':
+    if getattr(sys, 'frozen', False):
+        import multiprocessing
+        multiprocessing.freeze_support()
     logging.basicConfig(level=logging.DEBUG, filename=os.path.join(tempfile.gettempdir(), 'wallpaper.log'))
     pil_logger = logging.getLogger('PIL')
     pil_logger.setLevel(logging.ERROR)
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from wallpaper.tools import directory_tools
+
+
+@pytest.fixture
+def fresh_catalogue(tmp_path, monkeypatch):
+    """
+    Run in tmp_path, with a catalogue, history, index and image pools of the test's own.
+    The databases are opened relative to the working directory on first use.
+    """
+    monkeypatch.chdir(tmp_path)
+    for name, value in (('FileCache', None), ('update', None), ('Index', None), ('crawled', set()),
+                        ('chosen', set()), ('Pools', {})):
+        monkeypatch.setattr(directory_tools, name, value)
+    return tmp_path
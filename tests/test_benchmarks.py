@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from benchmarks.suite import compare, main
+
+
+def _results(**seconds):
+    return {'results': {name: {'seconds': s} for name, s in seconds.items()}}
+
+
+def test_compare_flags_regressions():
+    lines, regressions = compare(_results(a=1.0, b=1.0, gone=1.0), _results(a=1.05, b=1.5, added=1.0), 0.1)
+    assert regressions == ['b']
+    assert [line.split()[0] for line in lines] == ['a', 'added', 'b', 'gone']
+
+
+def test_run_and_compare(tmp_path):
+    output = str(tmp_path / 'results.json')
+    assert main(['run', '--only', 'layout', '--only', 'rect', '--repeat', '1', '--size', '640x480', '-o', output]) == 0
+    assert main(['compare', output, output]) == 0
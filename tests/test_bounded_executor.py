@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+import pytest
+from PIL import Image
+
+from wallpaper.tools.bounded_executor import BoundedExecutor, image_bytes
+from wallpaper.tools.perf import Counters
+
+
+def test_image_bytes():
+    assert image_bytes(Image.new('RGB', (10, 5))) == 150
+    assert image_bytes(Image.new('L', (10, 5))) == 50
+
+
+def test_submit_waits_for_room():
+    release = threading.Event()
+    with ThreadPoolExecutor(4) as pool:
+        bounded = BoundedExecutor(pool, max_jobs=2)
+        first = bounded.submit(release.wait)
+        bounded.submit(release.wait)
+        assert bounded.jobs == 2
+        # Full, so the next is turned away or waits
+        assert bounded.submit(release.wait, block=False) is None
+        submitted = threading.Event()
+        waiter = threading.Thread(target=lambda: (bounded.submit(int), submitted.set()))
+        waiter.start()
+        assert not submitted.wait(0.1)
+        release.set()
+        assert submitted.wait(5)
+        waiter.join()
+        first.result()
+    assert bounded.jobs == 0 and bounded.bytes == 0
+
+
+def test_weight_limit_lets_one_oversized_job_through():
+    Counters.reset()
+    release = threading.Event()
+    with ThreadPoolExecutor(4) as pool:
+        bounded = BoundedExecutor(pool, max_bytes=100)
+        assert bounded.submit(release.wait, weight=500) is not None
+        assert bounded.submit(int, weight=1, block=False) is None
+        release.set()
+        bounded.submit(int, weight=60).result()
+        bounded.submit(int, weight=60).result()
+    assert Counters.snapshot()['peaks']['pending_bytes'] == 500
+
+
+def test_failed_jobs_release_their_room():
+    def fail():
+        raise ValueError()
+
+    with ThreadPoolExecutor(1) as pool:
+        bounded = BoundedExecutor(pool, max_jobs=1)
+        with pytest.raises(ValueError):
+            bounded.submit(fail).result()
+        assert bounded.submit(int).result() == 0
+    with pytest.raises(RuntimeError):
+        bounded.submit(int)
+    assert bounded.jobs == 0
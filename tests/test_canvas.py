@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from PIL import Image
+
+from wallpaper.desktop.canvas import Canvas
+from wallpaper.monitor.monitor import blend_opaque
+from wallpaper.tools.perf import Counters
+
+
+def blank(box):
+    return Image.new('RGBA', (box[2] - box[0], box[3] - box[1]), (0, 0, 0, 0))
+
+
+def test_only_monitors_are_allocated():
+    Counters.reset()
+    # An L shaped desktop: a 100x100 monitor with a 50x20 one beside its top
+    canvas = Canvas((150, 100), [(0, 0, 100, 100), (100, 0, 150, 20), (0, 0, 100, 100)], blank)
+    assert len(canvas.buffers) == 2
+    assert canvas.bytes == (100 * 100 + 50 * 20) * 3
+    assert all(b.mode == 'RGB' for b in canvas.buffers.values())
+
+    canvas.buffer((100, 0, 150, 20)).paste((255, 0, 0), (0, 0, 50, 20))
+    image = canvas.assemble()
+    assert image.mode == 'RGB' and image.size == (150, 100)
+    assert image.getpixel((120, 10)) == (255, 0, 0)
+    assert image.getpixel((120, 50)) == (0, 0, 0)
+    assert canvas.peak_bytes == canvas.bytes + 150 * 100 * 3
+    assert Counters.snapshot()['peaks']['canvas_bytes'] == canvas.peak_bytes
+
+    canvas.overlay((100, 100))
+    canvas.release_overlays()
+    assert canvas.bytes == (100 * 100 + 50 * 20) * 3
+
+
+def test_load_fills_the_buffers():
+    canvas = Canvas((150, 100), [(100, 0, 150, 20)], blank)
+    canvas.load(Image.new('RGB', (150, 100), (1, 2, 3)))
+    assert canvas.buffer((100, 0, 150, 20)).getpixel((0, 0)) == (1, 2, 3)
+
+
+def test_blend_opaque_matches_blending_with_alpha():
+    background = Image.new('RGBA', (4, 4), (200, 100, 50, 255))
+    tile = Image.new('RGBA', (4, 4), (10, 20, 30, 128))
+    expected = Image.blend(background, tile, 0.4)
+    blended = blend_opaque(background.convert('RGB'), tile, 0.4)
+    assert all(abs(a - b) <= 1 for a, b in zip(blended.getpixel((0, 0)), expected.getpixel((0, 0))))
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+
+from wallpaper.tools.crawler import crawl
+from wallpaper.tools.file_cache import SQL_Cache
+
+
+def _tree(root):
+    for path in ('a', 'a/b', 'a/b/c', 'd'):
+        os.makedirs(root / path)
+        (root / path / 'image.jpg').write_bytes(b'')
+    return str(root)
+
+
+def _touch(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_rescan_only_lists_changed_directories(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    root = _tree(tmp_path / 'library')
+    stats = crawl([root], SQL_Cache())
+    assert (stats.directories, stats.listed) == (5, 5)
+
+    catalogue = SQL_Cache()
+    assert crawl([root], catalogue).listed == 0
+    deep = os.path.join(root, 'a', 'b', 'c')
+    (tmp_path / 'library' / 'a' / 'b' / 'c' / 'new.png').write_bytes(b'')
+    _touch(deep)
+    stats = crawl([root], catalogue)
+    assert (stats.directories, stats.listed) == (5, 1)
+    catalogue.flush()
+    assert len(SQL_Cache().get(deep).files) == 2
+
+
+def test_removed_directories_drop_out(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    root = _tree(tmp_path / 'library')
+    catalogue = SQL_Cache()
+    crawl([root], catalogue)
+    catalogue.flush()
+    os.remove(os.path.join(root, 'd', 'image.jpg'))
+    os.rmdir(os.path.join(root, 'd'))
+    _touch(root)
+    catalogue = SQL_Cache()
+    assert crawl([root], catalogue).directories == 4
+    catalogue.flush()
+    assert SQL_Cache().recorded(root)[1] == [os.path.join(root, 'a')]
+
+
+def test_choose_dir_walks_the_catalogue(fresh_catalogue):
+    from wallpaper.tools import directory_tools
+    root = _tree(fresh_catalogue / 'library')
+    directory_tools.expand_dirs_lite([f'+{root}'])
+    rng = random.Random(0)
+    chosen = {directory_tools.choose_dir_lite([f'+{root}'], rng) for _ in range(50)}
+    assert chosen <= {root, *(os.path.join(root, p) for p in ('a', 'a/b', 'a/b/c', 'd'))}
+    assert len(chosen) > 1
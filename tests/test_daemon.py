@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+from PIL import Image
+
+from wallpaper.config import WallpaperConfig
+from wallpaper.daemon import Daemon
+
+
+def make_daemon(tmp_path, **settings) -> Daemon:
+    library = tmp_path / 'library'
+    library.mkdir()
+    for i in range(4):
+        Image.new('RGB', (200, 150), (255, 40 * i, 0)).save(library / f'{i}.jpg')
+    config_file = tmp_path / 'pywallpaper.json'
+    config_file.write_text(json.dumps({'global_config': {
+        'fill_mode': 'simple', 'blending': False, 'mipmap_cache_mb': 0, 'desktop_backend': 'headless',
+        'directories': [str(library)], 'output_file': 'out.png', 'virtual_monitors': [[0, 0, 160, 100]],
+        **settings,
+    }}))
+
+    def load_config() -> WallpaperConfig:
+        config = WallpaperConfig()
+        with open(config_file) as fp:
+            config.load(fp)
+        return config
+
+    return Daemon(str(config_file), load_config)
+
+
+def test_daemon_keeps_its_desktop(fresh_catalogue):
+    daemon = make_daemon(fresh_catalogue, daemon_interval=0)
+    daemon.generate()
+    desktop = daemon.desktop
+    os.remove('out.png')
+    # More wallpapers than images in the library, which one process never used to make
+    for _ in range(5):
+        daemon.generate()
+    assert daemon.desktop is desktop
+    assert daemon.wallpapers == 6
+    assert os.path.exists('out.png')
+
+    config = json.loads(open(daemon.config_file).read())
+    config['global_config']['output_file'] = 'changed.png'
+    with open(daemon.config_file, 'w') as fp:
+        json.dump(config, fp)
+    os.utime(daemon.config_file, (0, 0))
+    assert daemon.wait(60)
+    daemon.generate()
+    assert daemon.desktop is not desktop
+    assert os.path.exists('changed.png')
+    daemon.desktop.close()
+
+
+def test_trigger_file_wakes_the_daemon(fresh_catalogue):
+    daemon = make_daemon(fresh_catalogue)
+    daemon.config_time = daemon._config_time()
+    open(daemon.trigger_file, 'w').close()
+    assert daemon.wait(60)
+    assert not os.path.exists(daemon.trigger_file)
+    daemon.stopping.set()
+    assert not daemon.wait(60)
+
+
+def test_run_stops_after_wallpapers(fresh_catalogue):
+    daemon = make_daemon(fresh_catalogue, daemon_interval=0)
+    daemon.run(wallpapers=2)
+    assert daemon.wallpapers == 2
+    assert daemon.desktop is None
+
+
+def test_seeded_daemon_makes_different_wallpapers(fresh_catalogue):
+    def layouts(daemon, count):
+        made = []
+        for _ in range(count):
+            daemon.generate()
+            made.append([tuple(region) for region in daemon.desktop.monitors[0].layout[1]])
+        daemon.desktop.close()
+        return made
+
+    first = layouts(make_daemon(fresh_catalogue, seed=3, fill_mode='swatch'), 3)
+    assert first[0] != first[1] != first[2]
+    # Still reproducible from the seed
+    (fresh_catalogue / 'library').rename(fresh_catalogue / 'old')
+    assert layouts(make_daemon(fresh_catalogue, seed=3, fill_mode='swatch'), 3) == first
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from PIL import Image
+
+from wallpaper.tools.draft_image import draft_image
+
+
+def _save(tmp_path, name, image):
+    path = tmp_path / name
+    image.save(path)
+    return Image.open(path)
+
+
+def test_jpeg_decodes_at_reduced_scale(tmp_path):
+    image = _save(tmp_path, 'big.jpg', Image.new('RGB', (4000, 3000), (200, 100, 50)))
+    image = draft_image(image, (600, 400))
+    image.load()
+    assert image.size == (1000, 750)
+
+
+def test_jpeg_draft_still_covers_target(tmp_path):
+    image = _save(tmp_path, 'big.jpg', Image.new('RGB', (4000, 3000)))
+    image = draft_image(image, (1100, 800))
+    assert image.size == (2000, 1500)
+
+
+def test_png_falls_back_to_reduce(tmp_path):
+    image = _save(tmp_path, 'big.png', Image.new('RGB', (800, 600), (10, 20, 30)))
+    image.info['filename'] = 'big.png'
+    image = draft_image(image, (100, 75))
+    assert image.size == (100, 75)
+    assert image.info['filename'] == 'big.png'
+
+
+def test_palette_png_is_left_for_resize(tmp_path):
+    image = _save(tmp_path, 'palette.png', Image.new('RGB', (800, 600), (10, 20, 30)).convert('P'))
+    assert image.mode == 'P'
+    image = draft_image(image, (100, 75))
+    assert image.size == (800, 600)
+    assert image.convert('RGBA').resize((100, 75)).size == (100, 75)
+
+
+def test_loaded_image_is_reduced(tmp_path):
+    image = _save(tmp_path, 'big.jpg', Image.new('RGB', (4000, 3000)))
+    image = image.rotate(90, expand=True)
+    image = draft_image(image, (600, 800))
+    assert image.size == (600, 800)
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+from PIL import Image
+
+from wallpaper.config import MonitorConfig
+from wallpaper.tools.encoder import Encoder
+
+
+def test_unchanged_wallpaper_is_not_written_again(tmp_path):
+    path = str(tmp_path / 'wallpaper.png')
+    image = Image.new('RGBA', (64, 32), (10, 20, 30, 255))
+    encoder = Encoder(compress_level=1)
+    first = encoder.write(image, path)
+    assert first.written and first.size == os.path.getsize(path)
+    with Image.open(path) as written:
+        assert written.format == 'PNG' and written.mode == 'RGB'
+
+    assert not encoder.write(image, path).written
+    image.putpixel((0, 0), (0, 0, 0, 255))
+    assert encoder.write(image, path).written
+    # Different settings make a different file from the same pixels
+    assert Encoder(compress_level=9).write(image, path).written
+
+
+def test_format_overrides_the_extension(tmp_path):
+    path = str(tmp_path / 'wallpaper.jpg')
+    config = MonitorConfig(output_format='bmp')
+    Encoder.from_config(config).write(Image.new('RGB', (8, 8)), path)
+    with Image.open(path) as written:
+        assert written.format == 'BMP'
+    with pytest.raises(ValueError):
+        Encoder('gif')
+
+
+def test_symlinked_output_keeps_its_link(tmp_path):
+    target = tmp_path / 'target.jpg'
+    target.write_bytes(b'')
+    link = tmp_path / 'wallpaper.jpg'
+    link.symlink_to(target)
+    Encoder().write(Image.new('RGB', (8, 8)), str(link))
+    assert link.is_symlink()
+    with Image.open(target) as written:
+        assert written.format == 'JPEG'
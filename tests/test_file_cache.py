@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+
+from wallpaper.tools.file_cache import SQL_Cache
+
+
+def _library(tmp_path, count):
+    library = tmp_path / 'library'
+    library.mkdir(exist_ok=True)
+    for i in range(count):
+        (library / f'{i}.jpg').write_bytes(b'')
+    (library / 'notes.txt').write_bytes(b'')
+    return str(library)
+
+
+def test_catalogue_persists(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    library = _library(tmp_path, 3)
+    cache = SQL_Cache()
+    assert sorted(os.path.basename(f) for f in cache.get(library).files) == ['0.jpg', '1.jpg', '2.jpg']
+    cache.flush()
+    assert cache.count() == 3
+
+    warm = SQL_Cache()
+    entry = warm._load(library)
+    assert entry.stat == os.stat(library).st_mtime
+    assert sorted(entry.files) == sorted(cache.get(library).files)
+    assert warm._db().execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+
+def test_changed_directory_is_listed_again(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    library = _library(tmp_path, 2)
+    cache = SQL_Cache()
+    assert len(cache.get(library).files) == 2
+    _library(tmp_path, 4)
+    stat = os.stat(library)
+    os.utime(library, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert len(cache.get(library).files) == 4
+    cache.flush()
+    assert len(SQL_Cache()._load(library).files) == 4
+
+
+def test_threads_use_their_own_connection(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache = SQL_Cache()
+    connections = []
+    thread = threading.Thread(target=lambda: connections.append(cache._db()))
+    thread.start()
+    thread.join()
+    assert connections[0] is not cache._db()
+    assert cache.get(str(tmp_path / 'missing')).files == []
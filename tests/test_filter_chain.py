@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+from PIL import Image, ImageChops
+
+from benchmarks.bench_filters import sample_image
+from wallpaper.filters.filter_chain import compile_filters, FilterChain
+from wallpaper.filters.wallpaper_filter import WallpaperFilter, ColourMatrixFilter, LookupFilter
+
+
+def test_clipping_matrices_are_not_fused():
+    chain = FilterChain(['sepia', 'fadetogrey'])
+    assert len(chain) == 2
+    image = sample_image((64, 48))
+    image.paste((200, 200, 200, 255), (0, 0, 8, 8))
+    expected = WallpaperFilter.get_filter('fadetogrey')(WallpaperFilter.get_filter('sepia')(image.copy()))
+    result = chain(image.copy())
+    assert result.mode == 'L'
+    assert result.tobytes() == expected.tobytes()
+
+
+def test_adjacent_matrices_fuse():
+    class Dim(ColourMatrixFilter, register=False):
+        matrix = (0.5, 0.25, 0, 10, 0, 0.75, 0, 0, 0.2, 0.2, 0.2, 50)
+
+    chain = FilterChain([])
+    chain._append(Dim())
+    chain._append(WallpaperFilter.get_filter('fadetogrey'))
+    assert len(chain) == 1
+    image = sample_image((64, 48))
+    expected = WallpaperFilter.get_filter('fadetogrey')(Dim()(image.copy()))
+    result = chain(image.copy())
+    assert result.mode == 'L'
+    # Nothing clips, only rounding Dim on its own can make a difference
+    assert ImageChops.difference(result, expected).getextrema()[1] <= 1
+
+
+def test_grey_output_stops_fusion():
+    chain = FilterChain(['fadetogrey', 'sepia', 'border'])
+    assert [type(s) for s in chain.steps] == [type(WallpaperFilter.get_filter(n)) for n in
+                                              ('fadetogrey', 'sepia', 'border')]
+
+
+def test_unknown_filters_dropped_and_plans_cached():
+    assert len(FilterChain(['nonesuch', 'border'])) == 1
+    assert compile_filters(['border']) is compile_filters(('border',))
+
+
+def test_lookups_fuse_exactly():
+    class Half(LookupFilter, register=False):
+        lut = [i // 2 for i in range(256)] * 3
+
+    class Invert(LookupFilter, register=False):
+        lut = [255 - i for i in range(256)] * 3
+
+    chain = FilterChain([])
+    chain._append(Half())
+    chain._append(Invert())
+    assert len(chain) == 1
+    image = Image.new('RGBA', (2, 2), (100, 50, 10, 7))
+    assert chain(image).getpixel((0, 0)) == (205, 230, 250, 7)
+    assert isinstance(FilterChain(['sepia']).steps[0], ColourMatrixFilter)
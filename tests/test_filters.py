@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from PIL import Image, ImageChops
+
+from benchmarks.bench_filters import legacy_sepia, sample_image
+from wallpaper.filters.wallpaper_filter import WallpaperFilter, LookupFilter
+
+
+def test_base_filters_not_registered():
+    names = WallpaperFilter.list_filters()
+    assert 'colourmatrixfilter' not in names
+    assert 'lookupfilter' not in names
+
+
+def test_sepia_matches_per_pixel_version():
+    image = sample_image((64, 48))
+    image.putalpha(Image.linear_gradient('L').resize((64, 48)))
+    result = WallpaperFilter.get_filter('sepia')(image.copy())
+    expected = legacy_sepia(image.copy())
+    assert result.mode == 'RGBA'
+    assert ImageChops.difference(result, expected).getextrema()[:3] <= ((0, 1),) * 3
+    assert result.getchannel('A').tobytes() == image.getchannel('A').tobytes()
+
+
+def test_fade_to_grey_matches_convert():
+    image = sample_image((64, 48))
+    result = WallpaperFilter.get_filter('fadetogrey')(image)
+    assert result.mode == 'L'
+    assert result.tobytes() == image.convert('RGB').convert('L').tobytes()
+
+
+def test_lookup_filter_keeps_alpha():
+    class Invert(LookupFilter, register=False):
+        lut = [255 - i for i in range(256)] * 3
+
+    image = Image.new('RGBA', (4, 4), (10, 20, 30, 40))
+    assert Invert()(image).getpixel((0, 0)) == (245, 235, 225, 40)
+    assert Invert()(Image.new('L', (4, 4), 10)).getpixel((0, 0)) == 245
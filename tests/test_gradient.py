@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from wallpaper.geom.size import Size
+from wallpaper.tools.gradient import make_gradient, gradient_region
+
+
+def test_gradient_rows():
+    image = make_gradient((300, 200), (128, 128, 128), (0, 0, 0))
+    assert image.mode == 'RGBA'
+    assert image.size == (300, 200)
+    assert image.getpixel((0, 0)) == (128, 128, 128, 255)
+    assert image.getpixel((299, 199)) == (0, 0, 0, 255)
+    # Every row is one colour, falling steadily from top to bottom
+    for y in range(200):
+        assert image.crop((0, y, 300, y + 1)).getcolors() is not None
+        assert len(image.crop((0, y, 300, y + 1)).getcolors()) == 1
+    assert abs(image.getpixel((0, 100))[0] - 64) <= 1
+
+
+def test_gradient_is_a_private_copy():
+    first = make_gradient((10, 10), (0, 0, 0), (255, 255, 255))
+    first.paste((1, 2, 3, 4), (0, 0, 10, 10))
+    assert make_gradient((10, 10), (0, 0, 0), (255, 255, 255)).getpixel((0, 0)) == (0, 0, 0, 255)
+
+
+def test_gradient_region_matches_the_whole():
+    whole = make_gradient((300, 200), (128, 128, 128), (0, 0, 0))
+    box = (40, 50, 140, 170)
+    assert gradient_region(Size(300, 200), (128, 128, 128), (0, 0, 0), box).tobytes() == whole.crop(box).tobytes()
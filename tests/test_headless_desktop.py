@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+import pytest
+from PIL import Image
+
+from wallpaper.config import WallpaperConfig
+from wallpaper.desktop import get_desktop_class
+from wallpaper.desktop.headless_desktop import HeadlessDesktop
+from wallpaper.monitor.monitor_rect import MonitorRect
+from wallpaper.monitor.virtual import get_monitors, parse_monitor
+from wallpaper.tools.perf import Counters
+
+
+def test_parse_monitor():
+    assert parse_monitor('1920x1080') == MonitorRect(0, 0, 1920, 1080)
+    assert parse_monitor('1280x1024@-1280,-200') == MonitorRect(-1280, -200, 0, 824)
+    with pytest.raises(ValueError):
+        parse_monitor('1920')
+
+
+def test_negative_offsets_are_normalized():
+    primary, left = get_monitors([(0, 0, 1920, 1080), (-1280, -200, 0, 824)])
+    assert tuple(left.physical) == (0, 0, 1280, 1024)
+    assert tuple(primary.physical) == (1280, 200, 3200, 1280)
+    assert not left.is_primary and primary.is_primary
+    assert not (left.needs_split or primary.needs_split)
+
+
+def test_render_to_file(fresh_catalogue):
+    library = fresh_catalogue / 'library'
+    library.mkdir()
+    for i in range(20):
+        Image.new('RGB', (200, 150), (255, 10 * i, 0)).save(library / f'{i}.jpg')
+
+    config = WallpaperConfig()
+    config.global_config.update({
+        'fill_mode': 'simple', 'blending': False, 'seed': 1, 'mipmap_cache_mb': 0,
+        'directories': [str(library)], 'output_file': 'out.png',
+        'virtual_monitors': [[0, 0, 160, 100], [-160, 0, 0, 100]],
+    })
+    assert get_desktop_class('headless') is HeadlessDesktop
+    HeadlessDesktop(config).generate_wallpaper()
+    with Image.open('out.png') as result:
+        assert result.size == (320, 100)
+        # Both monitors were painted
+        assert result.getpixel((80, 50))[0] == 255
+        assert result.getpixel((240, 50))[0] == 255
+
+
+def hue(pixel) -> str:
+    return 'red' if pixel[0] > 200 else 'blue' if pixel[2] > 200 else 'other'
+
+
+def make_library(path, colour):
+    path.mkdir()
+    for i in range(20):
+        Image.new('RGB', (200, 150), colour).save(path / f'{i}.jpg')
+    return str(path)
+
+
+def test_refresh_redoes_only_what_was_asked(fresh_catalogue):
+    red = make_library(fresh_catalogue / 'red', (255, 0, 0))
+    blue = make_library(fresh_catalogue / 'blue', (0, 0, 255))
+
+    config = WallpaperConfig()
+    config.global_config.update({
+        'fill_mode': 'simple', 'blending': False, 'seed': 1, 'mipmap_cache_mb': 0, 'stop_threshold': 8,
+        'directories': [red], 'output_file': 'out.png', 'virtual_monitors': [[0, 0, 160, 100], [-160, 0, 0, 100]],
+    })
+    desktop = HeadlessDesktop(config)
+    desktop.generate_wallpaper()
+
+    config.global_config.directories = [blue]
+    desktop.refresh_wallpaper([0])
+    with Image.open('out.png') as result:
+        assert hue(result.getpixel((80, 50))) == 'red'
+        assert hue(result.getpixel((240, 50))) == 'blue'
+        other_monitor = result.crop((0, 0, 160, 100)).tobytes()
+
+    config.global_config.directories = [red]
+    config.global_config.fill_mode = 'swatch'
+    desktop.refresh_wallpaper([0], regions=1)
+    with Image.open('out.png') as result:
+        assert {'red', 'blue'} <= {hue(result.getpixel((x, y))) for x in range(160, 320, 4) for y in range(0, 100, 4)}
+        # The other monitor was left alone
+        assert result.crop((0, 0, 160, 100)).tobytes() == other_monitor
+
+
+def test_collage_with_one_pending_tile(fresh_catalogue):
+    library = fresh_catalogue / 'library'
+    library.mkdir()
+    for i in range(20):
+        Image.new('RGB', (400, 300), (255, 0, 0)).save(library / f'{i}.jpg')
+
+    config = WallpaperConfig()
+    config.global_config.update({
+        'fill_mode': 'collage', 'blending': False, 'seed': 1, 'mipmap_cache_mb': 0, 'max_pending_tiles': 1,
+        'directories': [str(library)], 'output_file': 'out.png', 'virtual_monitors': [[0, 0, 640, 400]],
+    })
+    Counters.reset()
+    HeadlessDesktop(config).generate_wallpaper()
+    with Image.open('out.png') as result:
+        assert hue(result.getpixel((80, 50))) == 'red'
+    # Never more than one image, and the tile made from it, waiting at once
+    assert Counters.snapshot()['peaks']['pending_bytes'] <= 400 * 300 * 3 + 640 * 400 * 4
+
+
+def test_refresh_reuses_the_layout(fresh_catalogue):
+    red = make_library(fresh_catalogue / 'red', (255, 0, 0))
+    blue = make_library(fresh_catalogue / 'blue', (0, 0, 255))
+    config = WallpaperConfig()
+    config.global_config.update({
+        'fill_mode': 'swatch', 'blending': False, 'seed': 1, 'mipmap_cache_mb': 0, 'stop_threshold': 8,
+        'directories': [red], 'output_file': 'out.png', 'virtual_monitors': [[0, 0, 160, 100]],
+    })
+    desktop = HeadlessDesktop(config)
+    desktop.generate_wallpaper()
+    monitor = desktop.monitors[0]
+    layout = [tuple(region) for region in monitor.layout[1]]
+
+    config.global_config.directories = [blue]
+    desktop.refresh_wallpaper(regions=1)
+    assert [tuple(region) for region in monitor.layout[1]] == layout
+    with Image.open('out.png') as result:
+        redone = {(x, y) for x in range(160) for y in range(100) if hue(result.getpixel((x, y))) == 'blue'}
+    # Everything redrawn falls inside one region of the first wallpaper
+    assert redone and any(all(l <= x < r and t <= y < b for x, y in redone) for l, t, r, b in layout)
+
+    # Another refresh carries on from where the regions were drawn from, rather than starting over
+    state = monitor.region_rng.getstate()
+    monitor.set_monitor_config(config.global_config)
+    assert monitor.region_rng.getstate() == state
+
+
+def test_prefetch_reads_cached_levels(fresh_catalogue, monkeypatch):
+    from wallpaper.tools import mipmap_cache, prefetch
+
+    library = fresh_catalogue / 'library'
+    library.mkdir()
+    monkeypatch.setattr(mipmap_cache, 'Mipmaps', None)
+    mipmap_cache.configure(64)
+    for i in range(20):
+        Image.new('RGB', (800, 600), (255, 0, 0)).save(library / f'{i}.jpg')
+        mipmap_cache.load_image(mipmap_cache.open_image(str(library / f'{i}.jpg')), (320, 200))
+    read = []
+
+    def read_ahead(image):
+        read.append(image.info.get('mipmap'))
+        return image
+    monkeypatch.setattr(prefetch, 'read_ahead', read_ahead)
+
+    config = WallpaperConfig()
+    config.global_config.update({
+        'fill_mode': 'collage', 'blending': False, 'seed': 1, 'mipmap_cache_mb': 64, 'prefetch_depth': 2,
+        'directories': [str(library)], 'output_file': 'out.png', 'virtual_monitors': [[0, 0, 320, 200]],
+    })
+    HeadlessDesktop(config).generate_wallpaper()
+    # Smaller copies covering the monitor are read ahead, not the originals
+    assert read and all(read)
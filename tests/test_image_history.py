@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+
+from wallpaper.tools.bloom import BloomFilter
+from wallpaper.tools.image_history import SQL_ImageHistory, DB_PATH
+
+
+def test_bloom_filter():
+    bloom = BloomFilter(100)
+    for i in range(100):
+        bloom.add(f'/pictures/{i}')
+    assert all(f'/pictures/{i}' in bloom for i in range(100))
+    false_positives = sum(f'/elsewhere/{i}' in bloom for i in range(1000))
+    assert false_positives < 50
+    copy = BloomFilter.from_bytes(bloom.to_bytes())
+    assert '/pictures/7' in copy and copy.count == bloom.count
+
+
+def test_history_is_loaded_per_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    history = SQL_ImageHistory()
+    history.add_wall('/pictures/a/1.jpg')
+    history.add_wall('/pictures/a/2.jpg')
+    history.write_walls()
+    assert history.newWalls == set()
+    history.write_walls()
+
+    history = SQL_ImageHistory()
+    assert history.directories == {}
+    assert '/pictures/a' in history.bloom
+    assert '/pictures/b' not in history.bloom
+    assert history.get_available(['/pictures/a/1.jpg', '/pictures/a/3.jpg']) == ['/pictures/a/3.jpg']
+    assert set(history.directories) == {'/pictures/a'}
+    db = sqlite3.connect(DB_PATH)
+    assert db.execute('SELECT COUNT(*) FROM dir_entries').fetchone()[0] == 2
+
+
+def test_stale_bloom_is_rebuilt(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    SQL_ImageHistory()
+    db = sqlite3.connect(DB_PATH)
+    db.execute("INSERT INTO dir_entries VALUES ('/elsewhere', '1.jpg', 0)")
+    db.commit()
+    history = SQL_ImageHistory()
+    assert '/elsewhere' in history.bloom
+    assert history.get_available(['/elsewhere/1.jpg']) == []
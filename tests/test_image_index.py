@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+
+from PIL import Image
+
+from wallpaper.tools import directory_tools, image_index
+from wallpaper.tools.image_index import ImageIndex
+
+
+def _files(tmp_path, *names) -> list[str]:
+    paths = []
+    for name in names:
+        (tmp_path / name).write_bytes(name.encode())
+        paths.append(str(tmp_path / name))
+    return paths
+
+
+def test_suitable_skips_small_and_unreadable(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    small, large, broken, unknown = _files(tmp_path, 'small.png', 'large.png', 'broken.png', 'new.png')
+    index = ImageIndex()
+    index.record(small, Image.new('RGB', (10, 10)))
+    index.record(large, Image.new('RGBA', (100, 100)))
+    index.record_unreadable(broken)
+
+    assert index.suitable([small, large, broken, unknown], 50 * 50) == [large, unknown]
+    assert index.lookup(large).has_alpha
+
+
+def test_records_persist_on_flush(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    filename, = _files(tmp_path, 'image.jpg')
+    index = ImageIndex()
+    index.record(filename, Image.new('RGB', (40, 30)))
+    index.flush()
+
+    info = ImageIndex().lookup(filename)
+    assert (info.width, info.height, info.mode, info.has_alpha) == (40, 30, 'RGB', False)
+    assert info.aspect == 40 / 30
+
+
+def test_closest_aspect_prefers_matching_bucket(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    wide, tall, square, unknown = _files(tmp_path, 'wide.jpg', 'tall.jpg', 'square.jpg', 'new.jpg')
+    index = ImageIndex()
+    index.record(wide, Image.new('RGB', (1600, 900)))
+    index.record(tall, Image.new('RGB', (900, 1600)))
+    index.record(square, Image.new('RGB', (500, 500)))
+    files = [wide, tall, square, unknown]
+
+    # Unknown images could be any shape, so stay in
+    assert index.closest_aspect(files, 1920 / 1080) == [wide, unknown]
+    assert index.closest_aspect(files, 600 / 1000) == [tall, unknown]
+    assert index.closest_aspect([square, unknown], 8.0) == [square, unknown]
+
+
+def test_changed_files_lose_their_record(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    image, broken = _files(tmp_path, 'image.jpg', 'broken.jpg')
+    index = ImageIndex()
+    index.record(image, Image.new('RGB', (40, 30)))
+    index.record_unreadable(broken)
+    index.flush()
+
+    # Replaced in place
+    (tmp_path / 'image.jpg').write_bytes(b'a different image')
+    (tmp_path / 'broken.jpg').write_bytes(b'mended')
+    index = ImageIndex()
+    assert index.lookup(image) is None
+    assert index.lookup(broken) is None
+    assert index.suitable([image, broken], 50 * 50) == [image, broken]
+
+
+def test_old_index_is_upgraded(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    filename, = _files(tmp_path, 'image.jpg')
+    db = sqlite3.connect(image_index.DB_PATH)
+    db.execute('CREATE TABLE images (directory TEXT NOT NULL, filename TEXT NOT NULL, width INTEGER NOT NULL, '
+               'height INTEGER NOT NULL, mode TEXT NOT NULL, has_alpha INTEGER NOT NULL, format TEXT NOT NULL, '
+               'readable INTEGER NOT NULL, PRIMARY KEY (directory, filename))')
+    db.execute("INSERT INTO images VALUES (?, 'image.jpg', 40, 30, 'RGB', 0, 'JPEG', 1)", (str(tmp_path),))
+    db.commit()
+    db.close()
+    # Old records can't be checked against the file, so are treated as unknown
+    assert ImageIndex().lookup(filename) is None
+
+
+def test_only_unidentified_files_are_recorded_unreadable(fresh_catalogue, monkeypatch):
+    library = fresh_catalogue / 'library'
+    library.mkdir()
+    (library / 'notes.jpg').write_bytes(b'not an image')
+    directory_tools.expand_dirs_lite([])
+    assert directory_tools.get_new_image(str(library)) is None
+    assert not directory_tools.Index.lookup(str(library / 'notes.jpg')).readable
+
+    Image.new('RGB', (40, 30)).save(library / 'away.jpg')
+
+    tried = []
+
+    def unavailable(filename, size=None):
+        tried.append(filename)
+        raise OSError('Host is down')
+    monkeypatch.setattr(directory_tools, 'open_image', unavailable)
+    directory_tools.chosen.clear()
+    directory_tools.get_new_image(str(library))
+    assert str(library / 'away.jpg') in tried
+    assert directory_tools.Index.lookup(str(library / 'away.jpg')) is None
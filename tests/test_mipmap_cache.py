@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from PIL import Image
+
+from wallpaper.tools.disk_cache import DiskCache
+from wallpaper.tools.mipmap_cache import MipmapCache
+
+
+def _source(tmp_path, size=(2048, 1536)):
+    path = tmp_path / 'source.jpg'
+    Image.new('RGB', size, (90, 120, 150)).save(path)
+    return str(path)
+
+
+def test_store_and_open_smallest_covering_level(tmp_path):
+    filename = _source(tmp_path)
+    cache = MipmapCache(tmp_path / 'cache', 2 ** 30)
+    cache.store(filename, (2048, 1536), Image.open(filename).convert('RGB'))
+
+    image = cache.open(filename, (300, 200))
+    assert image.size == (512, 384)
+    assert image.info['filename'] == filename
+    assert cache.open(filename, (1500, 1000)) is None
+
+
+def test_changed_source_misses(tmp_path):
+    filename = _source(tmp_path)
+    cache = MipmapCache(tmp_path / 'cache', 2 ** 30)
+    cache.store(filename, (2048, 1536), Image.open(filename).convert('RGB'))
+    _source(tmp_path, (1024, 768))
+    assert cache.open(filename, (100, 100)) is None
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(tmp_path / 'cache', 2 ** 30)
+    cache.put('a_1', Image.new('RGB', (64, 64)))
+    entry = cache.total
+    # Room for two entries, not three
+    cache.budget = entry * 5 // 2
+    cache.put('b_1', Image.new('RGB', (64, 64)))
+    assert cache.find('a_', (1, 1)) is not None
+    cache.put('c_1', Image.new('RGB', (64, 64)))
+    assert cache.total == 2 * entry
+    assert cache.find('b_', (1, 1)) is None
+    assert cache.find('a_', (1, 1)) is not None
+    assert cache.find('c_', (1, 1)) is not None
+
+
+def test_disk_cache_budget_is_shared(tmp_path):
+    # Two caches on one directory, as the parent and a render worker process have
+    first = DiskCache(tmp_path / 'cache', 2 ** 30)
+    second = DiskCache(tmp_path / 'cache', 2 ** 30)
+    first.put('a_1', Image.new('RGB', (64, 64)))
+    entry = first.total
+    second.budget = entry * 3 // 2
+    second.put('b_1', Image.new('RGB', (64, 64)))
+    assert second.total == entry
+    assert first.find('a_', (1, 1)) is None
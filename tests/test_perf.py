@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from wallpaper.tools.perf import PerfCounters
+
+
+def test_timed_and_count():
+    counters = PerfCounters()
+
+    @counters.timed('decorated')
+    def work():
+        return 1
+
+    assert work() + work() == 2
+    with counters.timed('block'):
+        counters.count('things', 3)
+        counters.peak('bytes', 10)
+        counters.peak('bytes', 5)
+    snapshot = counters.snapshot()
+    assert snapshot['stages']['decorated']['calls'] == 2
+    assert snapshot['stages']['block']['seconds'] >= 0
+    assert snapshot['counts'] == {'things': 3}
+    assert snapshot['peaks'] == {'bytes': 10}
+    counters.reset()
+    assert counters.snapshot() == {'stages': {}, 'counts': {}, 'peaks': {}}
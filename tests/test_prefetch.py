@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from PIL import Image
+
+from wallpaper.tools.prefetch import Prefetcher, read_ahead
+
+
+def _images(tmp_path, count):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f'{i}.png'
+        Image.new('RGB', (8, 8), (i, i, i)).save(path)
+        paths.append(str(path))
+    return paths
+
+
+def _opener(paths):
+    remaining = list(paths)
+
+    def produce():
+        if not remaining:
+            return None
+        image = Image.open(remaining.pop(0))
+        image.info['filename'] = image.filename
+        return image
+    return produce
+
+
+def test_prefetcher_yields_all_then_none(tmp_path):
+    paths = _images(tmp_path, 5)
+    prefetcher = Prefetcher(_opener(paths), 2).start()
+    seen = []
+    while (image := prefetcher.get()) is not None:
+        seen.append(image.info['filename'])
+    prefetcher.close()
+    assert seen == paths
+    assert prefetcher.gets == 6
+
+
+def test_close_releases_queued_images(tmp_path):
+    prefetcher = Prefetcher(_opener(_images(tmp_path, 5)), 3).start()
+    assert prefetcher.get() is not None
+    prefetcher.close()
+    assert prefetcher.queue.empty()
+
+
+def test_read_ahead_keeps_info(tmp_path):
+    image = Image.open(_images(tmp_path, 1)[0])
+    image.info['filename'] = image.filename
+    image = read_ahead(image)
+    assert image.info['filename'].endswith('0.png')
+    assert image.getpixel((0, 0)) == (0, 0, 0)
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from wallpaper.tools.region_lock import RegionLock, overlaps
+
+
+def test_overlaps():
+    assert overlaps((0, 0, 10, 10), (5, 5, 15, 15))
+    assert not overlaps((0, 0, 10, 10), (10, 0, 20, 10))
+
+
+def test_disjoint_regions_held_together():
+    lock = RegionLock()
+    canvas = object()
+    with lock.hold(canvas, (0, 0, 10, 10)):
+        inner = threading.Thread(target=lambda: lock.hold(canvas, (10, 0, 20, 10)).__enter__())
+        inner.start()
+        inner.join(timeout=1)
+        assert not inner.is_alive()
+
+
+def test_overlapping_region_waits():
+    lock = RegionLock()
+    canvas = object()
+    entered = threading.Event()
+
+    def other():
+        with lock.hold(canvas, (5, 5, 15, 15)):
+            entered.set()
+
+    with lock.hold(canvas, (0, 0, 10, 10)):
+        thread = threading.Thread(target=other)
+        thread.start()
+        assert not entered.wait(0.1)
+        with lock.hold(object(), (0, 0, 10, 10)):
+            pass
+    thread.join(timeout=1)
+    assert entered.is_set()
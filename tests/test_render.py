@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from PIL import Image
+
+from wallpaper.geom.size import Size
+from wallpaper.monitor.render import TileMonitor, render_in_process, render_tile
+
+
+def _open(tmp_path):
+    path = tmp_path / 'source.jpg'
+    Image.new('RGB', (640, 480), (200, 150, 100)).save(path)
+    image = Image.open(path)
+    image.info['filename'] = str(path)
+    return image
+
+
+def test_render_tile(tmp_path):
+    tile = render_tile(_open(tmp_path), (64, 48), Image.Resampling.LANCZOS, ['border'], None, (0, 0))
+    assert (tile.mode, tile.size) == ('RGBA', (64, 48))
+    assert tile.getpixel((0, 0)) == (0, 0, 0, 255)
+
+
+def test_process_matches_thread(tmp_path):
+    monitor = TileMonitor(Size(640, 480), 0)
+    args = ((64, 48), Image.Resampling.LANCZOS, ['border'], monitor, (10, 10))
+    expected = render_tile(_open(tmp_path), *args)
+    tile = render_in_process(_open(tmp_path), *args)
+    assert tile.tobytes() == expected.tobytes()
+
+
+def test_seeded_jiggle_is_repeatable(tmp_path):
+    monitor = TileMonitor(Size(640, 480), 0, seed=42)
+    args = ((64, 48), Image.Resampling.LANCZOS, ['jiggle'], monitor, (10, 10))
+    first = render_tile(_open(tmp_path), *args)
+    second = render_in_process(_open(tmp_path), *args)
+    assert first.tobytes() == second.tobytes()
+    assert monitor.tile_random((10, 10)).random() != monitor.tile_random((20, 10)).random()
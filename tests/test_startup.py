@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+from benchmarks.bench_import import run_startup, unexpected_modules
+from wallpaper.filters.wallpaper_filter import WallpaperFilter
+
+
+def test_startup_leaves_backends_and_filters_unimported():
+    result, _log = run_startup()
+    assert unexpected_modules(result['modules']) == []
+
+
+def test_filters_load_on_first_use():
+    assert set(WallpaperFilter.Modules) <= set(WallpaperFilter.list_filters())
+    assert type(WallpaperFilter.get_filter('jiggle')).__name__ == 'Jiggle'
+    assert WallpaperFilter.load('nonesuch') is None
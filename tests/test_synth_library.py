@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+import os
+
+from PIL import Image
+
+from benchmarks.synth_library import generate
+
+
+def test_generate(tmp_path):
+    files = generate(str(tmp_path), 10, fan_out=2, depth=1, formats=['jpeg', 'rgba'], sizes=[(64, 48)], jitter=0)
+    assert len(files) == 10
+    assert {os.path.dirname(f) for f in files} == {str(tmp_path), str(tmp_path / 'd0_0'), str(tmp_path / 'd0_1')}
+    with Image.open(files[1]) as image:
+        assert (image.format, image.mode, image.size) == ('PNG', 'RGBA', (64, 48))
+    assert generate(str(tmp_path / 'again'), 10, 2, 1, ['jpeg', 'rgba'], [(64, 48)], 0)[0].endswith('.jpg')
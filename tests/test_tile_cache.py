@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from PIL import Image
+
+from wallpaper.filters.filter_chain import FilterChain
+from wallpaper.geom.size import Size
+from wallpaper.monitor.render import TileMonitor
+from wallpaper.tools.tile_cache import TileCache, tile_key
+
+
+def _source(tmp_path):
+    path = tmp_path / 'source.png'
+    Image.new('RGB', (64, 64), (1, 2, 3)).save(path)
+    image = Image.open(path)
+    image.info['filename'] = str(path)
+    return image
+
+
+def test_keys_follow_sizer_filters_and_position(tmp_path):
+    image = _source(tmp_path)
+    monitor = TileMonitor(Size(100, 100), 0)
+
+    def key(size, chain, position, sizer=Image.Resampling.LANCZOS):
+        return tile_key(image, size, sizer, chain, monitor, position)
+
+    border = FilterChain(['border'])
+    assert key((10, 10), border, (0, 0)) == key((10, 10), border, (5, 5))
+    assert key((10, 10), border, (0, 0)) != key((20, 20), border, (0, 0))
+    assert key((10, 10), border, (0, 0)) != key((10, 10), border, (0, 0), Image.Resampling.BICUBIC)
+    tunnel = FilterChain(['tunnel'])
+    assert key((10, 10), tunnel, (0, 0)) != key((10, 10), tunnel, (5, 5))
+    assert key((10, 10), FilterChain(['jiggle']), (0, 0)) is None
+
+
+def test_memory_budget_and_disk_fallback(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache = TileCache(100 * 100 * 4, 2 ** 20)
+    first = Image.new('RGBA', (100, 100), (1, 2, 3, 4))
+    cache.put('a', first)
+    cache.put('b', Image.new('RGBA', (100, 100)))
+    assert list(cache.memory) == ['b']
+    assert cache.get('a').tobytes() == first.tobytes()
+    assert cache.get('c') is None
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import random
+
+from PIL import Image
+
+from wallpaper.tools import directory_tools
+from wallpaper.tools.unseen_pool import UnseenPool, DirectoryPool
+
+
+def test_swap_remove_keeps_the_index_in_step():
+    pool = UnseenPool(f'{i}.jpg' for i in range(10))
+    for name in ('0.jpg', '9.jpg', '4.jpg', 'missing.jpg'):
+        pool.discard(name)
+    assert len(pool) == 7
+    assert sorted(pool.items) == sorted(f'{i}.jpg' for i in (1, 2, 3, 5, 6, 7, 8))
+    assert all(pool.items[i] == item for item, i in pool.index.items())
+    rng = random.Random(0)
+    while pool:
+        pool.discard(pool.draw(rng))
+    assert pool.draw(rng) is None
+
+
+def test_draws_prefer_the_nearest_bucket():
+    buckets = {'wide.jpg': 4, 'square.jpg': 0, 'tall.jpg': -4}
+    pool = DirectoryPool(['square.jpg', 'tall.jpg', 'unknown.jpg', 'wide.jpg'], buckets.get)
+    rng = random.Random(0)
+    # Unknown images could be any shape, so are drawn alongside the nearest
+    assert {pool.draw(rng, 3, 2) for _ in range(50)} == {'wide.jpg', 'unknown.jpg'}
+    assert {pool.draw(rng, 0, 2) for _ in range(50)} == {'square.jpg', 'unknown.jpg'}
+    # Nothing known close enough, so anything unseen, the unknown image included
+    assert {pool.draw(rng, 10, 2) for _ in range(100)} == set(buckets) | {'unknown.jpg'}
+    pool.discard('wide.jpg')
+    assert 'wide.jpg' not in pool.buckets[4]
+    pool.discard('unknown.jpg')
+    assert 'unknown.jpg' not in pool.unknown
+    assert pool.draw(rng, 3, 2) != 'wide.jpg'
+
+
+def test_get_new_image_uses_every_image_before_repeating(fresh_catalogue):
+    library = fresh_catalogue / 'library'
+    library.mkdir()
+    for i in range(6):
+        Image.new('RGB', (40, 30)).save(library / f'{i}.jpg')
+    directory_tools.expand_dirs_lite([])
+
+    rng = random.Random(0)
+    picked = [directory_tools.get_new_image(str(library), rng=rng).filename for _ in range(6)]
+    assert len(set(picked)) == 6
+    assert directory_tools.get_new_image(str(library), rng=rng) is None
+    assert str(library) not in directory_tools.Pools
+    # Once the directory has started over, images only come back when the run is done with them
+    directory_tools.chosen.clear()
+    assert directory_tools.get_new_image(str(library), rng=rng).filename in picked
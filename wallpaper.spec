@@ -7,7 +7,9 @@ a = Analysis(['main.py'],
              pathex=[],
              binaries=[],
              datas=[],
-             hiddenimports=[],
+             # Imported lazily by name, so the analysis can't see them
+             hiddenimports=['wallpaper.filters.border', 'wallpaper.filters.fade_to_grey',
+                            'wallpaper.filters.sepia', 'wallpaper.filters.tunnel'],
              hookspath=[],
              hooksconfig={},
              runtime_hooks=[],
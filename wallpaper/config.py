@@ -44,6 +44,41 @@ class MonitorConfig(DataclassIO):
     spanning: bool = False
     stack_mode: bool = False
     stop_threshold: int = 32
+    # Byte budget for the on disk cache of downscaled source images, 0 to disable
+    mipmap_cache_mb: int = 256
+    # Candidate images to select and read ahead of the collage loop, 0 to disable
+    prefetch_depth: int = 0
+    # Byte budgets for caching resized and filtered tiles, in memory and on disk, 0 to disable
+    tile_cache_mb: int = 0
+    tile_disk_cache_mb: int = 0
+    # Where images are resized and filtered, thread or process
+    render_backend: str = 'thread'
+    # Tiles handed to the workers and not yet placed, as a count and the estimated MB of their decoded images, 0 for
+    # no limit. When either is reached, block waits for a tile to be placed and shed leaves a gap instead
+    max_pending_tiles: int = 16
+    max_pending_mb: int = 256
+    pending_overflow: str = 'block'
+    # Seed for layout, image choice and random filters, None for a different wallpaper every time
+    seed: int | None = None
+    # Desktop backend, '' for the platform's own or 'headless' to render to output_file without a display
+    desktop_backend: str = ''
+    # Headless only: where to write, and the monitors as [left, top, right, bottom] with the primary first
+    output_file: str = 'pywallpaper.jpg'
+    virtual_monitors: list[list[int]] = dataclasses.field(default_factory=list)
+    # How the wallpaper file is written: jpeg, png, bmp, tiff or webp, '' for the output file's extension (jpeg on
+    # Windows). bmp and tiff are uncompressed and quickest to write, where the platform takes them
+    output_format: str = ''
+    output_quality: int = 90
+    # JPEG chroma subsampling, 4:4:4, 4:2:2 or 4:2:0, '' for Pillow's default
+    output_subsampling: str = ''
+    output_optimize: bool = False
+    # PNG compression, 0 (none) to 9
+    output_compress_level: int = 6
+    # Daemon only: seconds between wallpapers
+    daemon_interval: int = 900
+    # Redo only these monitors, or this many strips or swatches on each, over the last wallpaper. Empty and 0 for all
+    refresh_monitors: list[int] = dataclasses.field(default_factory=list)
+    refresh_regions: int = 0
     directories: list[str] = dataclasses.field(default_factory=list)
     desktop_filters: list[str] = dataclasses.field(default_factory=list)
     image_filters: list[str] = dataclasses.field(default_factory=list)
@@ -64,5 +99,12 @@ class WallpaperConfig:
             monitor.update(v)
             self.monitors[k] = monitor
 
+    def set_option(self, name: str, value):
+        """
+        Override an option for the global config and every monitor, e.g. from the command line
+        """
+        for config in (self.global_config, *self.monitors.values()):
+            setattr(config, name, value)
+
     def dump(self, fp: IO):
         json.dump(self.__dict__, fp, cls=DataclassJSON_Encoder, indent=4)
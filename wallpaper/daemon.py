@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+import signal
+import threading
+import time
+from typing import Callable
+
+from wallpaper.config import WallpaperConfig, MonitorConfig
+from wallpaper.desktop import Desktop, get_desktop_class
+from wallpaper.tools import directory_tools
+
+logger = logging.getLogger(__name__)
+# Seconds between looks at the trigger file and the config file
+POLL_INTERVAL = 1.0
+
+
+class Daemon:
+    """
+    Stay resident and make a new wallpaper every `daemon_interval` seconds, keeping the catalogue, history,
+    caches and worker pools warm in between.
+
+    A wallpaper can be asked for early by creating `trigger_file`, or with SIGUSR1 where there is one. When
+    `config_file` changes it is loaded again, the desktop rebuilt and a wallpaper made straight away.
+
+    :param config_file: The config file to watch
+    :param load_config: Loads the config, with any command line overrides applied
+    :param trigger_file: Created to ask for a wallpaper now, removed once it has been seen
+    """
+
+    def __init__(self, config_file: str, load_config: Callable[[], WallpaperConfig],
+                 trigger_file: str = 'pywallpaper.trigger'):
+        self.config_file = config_file
+        self.load_config = load_config
+        self.trigger_file = trigger_file
+        self.requested = threading.Event()
+        self.stopping = threading.Event()
+        self.desktop: Desktop | None = None
+        self.config_time: float | None = None
+        self.wallpapers = 0
+
+    def _config_time(self) -> float | None:
+        try:
+            return os.stat(self.config_file).st_mtime
+        except OSError:
+            return None
+
+    @property
+    def interval(self) -> float:
+        config = self.desktop.config if self.desktop else MonitorConfig()
+        return config.daemon_interval
+
+    def reload(self):
+        """
+        Load the config and build a new desktop for it. A config that fails to load leaves the old desktop running.
+        """
+        self.config_time = self._config_time()
+        config = self.load_config()
+        if self.desktop:
+            self.desktop.close()
+            self.desktop = None
+        # The roots may have changed, crawl them again. Unchanged directories only cost a stat
+        directory_tools.crawled.clear()
+        self.desktop = get_desktop_class(config.global_config.desktop_backend)(config)
+        # Under a seed, carry on from the wallpapers already made rather than repeating them
+        self.desktop.wallpapers = self.wallpapers
+        logger.info('Loaded %s', self.config_file)
+
+    def generate(self):
+        if self.desktop is None or self._config_time() != self.config_time:
+            self.reload()
+        # Every wallpaper can choose from the whole library again, as a fresh process would
+        directory_tools.chosen.clear()
+        start = time.perf_counter()
+        self.wallpapers += 1
+        config = self.desktop.config
+        if self.desktop.composite is not None and (config.refresh_monitors or config.refresh_regions):
+            self.desktop.refresh_wallpaper(config.refresh_monitors, config.refresh_regions)
+        else:
+            if self.desktop.composite is not None:
+                self.desktop.create_empty_wallpaper()
+            self.desktop.generate_wallpaper()
+        logger.info('Wallpaper %d took %.2fs', self.wallpapers, time.perf_counter() - start)
+
+    def _take_trigger(self) -> bool:
+        try:
+            os.remove(self.trigger_file)
+            return True
+        except OSError:
+            return False
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Sleep until the next wallpaper is due, asked for, or the config changes
+
+        :return: False if the daemon is stopping instead
+        """
+        deadline = time.monotonic() + timeout
+        while not self.stopping.is_set():
+            if self._take_trigger() or self.requested.is_set():
+                self.requested.clear()
+                return True
+            if self._config_time() != self.config_time:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            self.stopping.wait(min(POLL_INTERVAL, remaining))
+        return False
+
+    def _install_signals(self):
+        if threading.current_thread() is not threading.main_thread():
+            return
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda *_: self.requested.set())
+        for name in ('SIGINT', 'SIGTERM'):
+            signal.signal(getattr(signal, name), lambda *_: self.stopping.set())
+
+    def run(self, wallpapers: int | None = None):
+        """
+        Make wallpapers until stopped
+
+        :param wallpapers: Stop after this many, None to carry on until signalled
+        """
+        self._install_signals()
+        self._take_trigger()
+        made = 0
+        try:
+            while not self.stopping.is_set():
+                try:
+                    self.generate()
+                except Exception:
+                    logger.exception('Making wallpaper')
+                made += 1
+                if wallpapers is not None and made >= wallpapers:
+                    break
+                if not self.wait(self.interval):
+                    break
+        finally:
+            if self.desktop:
+                self.desktop.close()
+                self.desktop = None
@@ -1,2 +1,24 @@
 # -*- coding: utf-8 -*-
+import sys
+
 from .desktop import Desktop
+
+
+def get_desktop_class(backend: str = '') -> type[Desktop]:
+    """
+    The Desktop for a `desktop_backend` setting. Platform modules are only imported when chosen.
+    Platforms without their own backend render headless.
+    """
+    if backend == 'headless':
+        from .headless_desktop import HeadlessDesktop
+        return HeadlessDesktop
+    if backend:
+        raise ValueError(f'Unknown desktop backend: {backend}')
+    if sys.platform == 'darwin':
+        from .osx_desktop import OSX_Desktop
+        return OSX_Desktop
+    if sys.platform == 'win32':
+        from .windows_desktop import WindowsDesktop
+        return WindowsDesktop
+    from .headless_desktop import HeadlessDesktop
+    return HeadlessDesktop
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+from typing import Callable, Sequence
+
+from PIL import Image
+
+from wallpaper.tools.bounded_executor import image_bytes
+from wallpaper.tools.perf import Counters
+from wallpaper.tools.region_lock import Box
+
+logger = logging.getLogger(__name__)
+
+
+class Canvas:
+    """
+    The wallpaper being drawn, as a buffer per monitor rather than one image over the bounding box of them all, so
+    the dead space around offset monitors is never allocated. Buffers are RGB, tiles bring their own alpha and only
+    stack mode's overlays need one. The whole desktop image is only put together by `assemble`, to be written.
+
+    :param size: Size of the whole desktop
+    :param boxes: Where the monitors are on the desktop, (left, top, right, bottom)
+    :param blank: What an empty wallpaper has inside a box of the desktop
+    """
+
+    def __init__(self, size: Sequence[int], boxes: Sequence[Box], blank: Callable[[Box], Image.Image]):
+        self.size = tuple(size)
+        self.blank = blank
+        self.lock = threading.Lock()
+        self.bytes = 0
+        self.peak_bytes = 0
+        self.buffers: dict[Box, Image.Image] = {}
+        self.overlays: list[Image.Image] = []
+        for box in boxes:
+            self.buffer(box)
+
+    def _track(self, n: int):
+        self.bytes += n
+        self.peak_bytes = max(self.peak_bytes, self.bytes)
+        Counters.peak('canvas_bytes', self.bytes)
+
+    def buffer(self, box: Box) -> Image.Image:
+        """
+        The buffer for the monitor at `box`, blank the first time it's asked for. Mirrored monitors share one.
+        """
+        box = tuple(box)
+        with self.lock:
+            buffer = self.buffers.get(box)
+            if buffer is None:
+                buffer = self.blank(box)
+                if buffer.mode != 'RGB':
+                    buffer = buffer.convert('RGB')
+                self.buffers[box] = buffer
+                self._track(image_bytes(buffer))
+            return buffer
+
+    def overlay(self, size: Sequence[int]) -> Image.Image:
+        """
+        A transparent layer for stack mode to draw on, until `release_overlays`
+        """
+        overlay = Image.new('RGBA', tuple(size), (0, 0, 0, 0))
+        with self.lock:
+            self.overlays.append(overlay)
+            self._track(image_bytes(overlay))
+        return overlay
+
+    def release_overlays(self):
+        with self.lock:
+            self.bytes -= sum(image_bytes(o) for o in self.overlays)
+            self.overlays = []
+
+    def load(self, image: Image.Image):
+        """
+        Fill the buffers from an image of the whole desktop, such as the current wallpaper
+        """
+        for box, buffer in self.buffers.items():
+            buffer.paste(image.crop(box))
+
+    def assemble(self) -> Image.Image:
+        """
+        The whole desktop, in RGB. Anything no monitor covers is blank.
+        """
+        width, height = self.size
+        covered = sum((r - l) * (b - t) for l, t, r, b in self.buffers) >= width * height
+        with self.lock:
+            image = Image.new('RGB', self.size) if covered else self.blank((0, 0, width, height)).convert('RGB')
+            self._track(image_bytes(image))
+            for box, buffer in self.buffers.items():
+                image.paste(buffer, box[:2])
+            # Owned by the caller from here on, but it counts towards the peak
+            self.bytes -= image_bytes(image)
+        logger.info('Canvas: %d bytes in %d buffers, peak %d', self.bytes, len(self.buffers), self.peak_bytes)
+        return image
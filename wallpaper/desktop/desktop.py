@@ -1,14 +1,21 @@
 # -*- coding: utf-8 -*-
 import logging
 from concurrent.futures import ThreadPoolExecutor
+from typing import Sequence
 
-from PIL import Image, ImageDraw, ImageFile
+from PIL import Image, ImageFile
 
 from wallpaper.config import WallpaperConfig, MonitorConfig
 from wallpaper.geom.size import Size
 from wallpaper.monitor import get_monitors, Monitor
 from wallpaper.monitor.monitor_rect import MonitorRect
+from wallpaper.filters.filter_chain import compile_filters
 from wallpaper.filters.wallpaper_filter import WallpaperFilter
+from wallpaper.tools import mipmap_cache, tile_cache
+from wallpaper.tools.encoder import Encoder
+from wallpaper.tools.gradient import gradient_region
+from wallpaper.tools.perf import Counters
+from .canvas import Canvas
 
 MID_GREY = (128, 128, 128)
 DARK_GREY = (64, 64, 64)
@@ -22,6 +29,8 @@ class Desktop:
 
     :param config: The :mod:`ConfigParser` object
     """
+    # Image formats the platform will take as a wallpaper, None for any
+    OutputFormats: tuple[str, ...] | None = None
 
     def __init__(self, config: WallpaperConfig):
         self._master_monitor = None
@@ -32,19 +41,32 @@ class Desktop:
         self.win_size: tuple[int, int] | None = None
 
         self.bg_colour = (0, 0, 0)
+        # The wallpaper being drawn, and the finished desktop image once it has been put together
+        self.canvas: Canvas | None = None
         self.bg_image = None
+        # The last wallpaper's canvas, for refresh_wallpaper to draw over
+        self.composite: Canvas | None = None
+        # Wallpapers made so far, so a seeded run's later wallpapers differ from its first
+        self.wallpapers = 0
+        mipmap_cache.configure(self.config.mipmap_cache_mb)
+        tile_cache.configure(self.config.tile_cache_mb, self.config.tile_disk_cache_mb)
+        self.encoder = Encoder.from_config(self.config)
+        if self.OutputFormats and self.encoder.image_format not in ('', *self.OutputFormats):
+            logger.warning('%s wallpapers are not supported here, using %s', self.encoder.image_format,
+                           self.OutputFormats[0])
+            self.encoder.image_format = self.OutputFormats[0]
         self.set_monitor_extents()
         self.create_empty_wallpaper()
 
     def load_current_wallpaper(self):
         pass
 
+    @Counters.timed('desktop_filters')
     def set_wallpaper(self):
         logger.info('Filters: %s', WallpaperFilter.list_filters())
         logger.info('Desktop Filters: %s', self.config.desktop_filters)
 
-        for image_filter in self.config.desktop_filters:
-            self.bg_image = WallpaperFilter.get_filter(image_filter)(self.bg_image, None, (0,0))
+        self.bg_image = compile_filters(self.config.desktop_filters)(self.canvas.assemble(), None, (0, 0))
 
     def calc_wallpaper_size(self) -> Size:
         """
@@ -64,54 +86,55 @@ class Desktop:
 
         return Size(width, height)
 
+    def get_monitors(self):
+        """
+        The monitors making up this desktop
+        """
+        return get_monitors()
+
     def set_monitor_extents(self):
         """
         Set the monitor sizes, and positions
         """
-        self.monitors = get_monitors()
+        self.monitors = self.get_monitors()
         self.win_size = self.calc_wallpaper_size()
         sz = MonitorRect(0, 0, self.win_size.width, self.win_size.height)
         self._master_monitor = Monitor(-1, sz, sz, 0, 0)
 
     def create_empty_wallpaper(self):
         """
-        Create an image representing the entire desktop
+        Start a new canvas for the entire desktop
         """
         c = (0, 0, 0, 0)
         stack_mode = self.config.stack_mode or any(m.config.stack_mode for m in self.monitors)
         self.bg_colour = c
-        self.bg_image = bgImage = Image.new('RGBA', tuple(self.win_size), c)
+        self.bg_image = None
+        monitors = self.monitors if not self.config.spanning else [self._master_monitor, ]
+        boxes = [tuple(m.physical) for m in monitors]
 
         if stack_mode:
+            self.canvas = Canvas(self.win_size, boxes, lambda box: Image.new('RGB', (box[2] - box[0], box[3] - box[1])))
             self.load_current_wallpaper()
             return
 
+        self.canvas = Canvas(self.win_size, boxes, self.blank)
+
+    def gradient_colours(self) -> tuple[tuple[int, int, int], tuple[int, int, int]]:
+        r, g, b, _a = self.bg_colour
+        if (r + g + b) / 3 < 64:
+            top = MID_GREY
+        else:
+            top = (r, g, b)
+            r, g, b = DARK_GREY
+        return top, (r, g, b)
+
+    def blank(self, box: tuple[int, int, int, int]) -> Image.Image:
+        """
+        What an empty wallpaper has inside `box`
+        """
         if self.config.gradient:
-            r, g, b, _a = c
-            width, height = bgImage.size
-            fh = float(height)
-
-            if (r + g + b) / 3 < 64:
-                r1, g1, b1 = MID_GREY
-            else:
-                r1, g1, b1, _a = c
-                r, g, b = DARK_GREY
-
-            rd = r1 - r
-            gd = g1 - g
-            bd = b1 - b
-
-            rs = float(rd) / fh
-            gs = float(gd) / fh
-            bs = float(bd) / fh
-
-            draw = ImageDraw.Draw(bgImage)
-            for h in range(0, height):
-                draw.line((0, h, width, h),
-                          fill=(int(r1), int(g1), int(b1)))
-                r1 -= rs
-                b1 -= bs
-                g1 -= gs
+            return gradient_region(self.win_size, *self.gradient_colours(), box)
+        return Image.new('RGBA', (box[2] - box[0], box[3] - box[1]), self.bg_colour)
 
     def generate_wallpaper(self):
         """
@@ -120,13 +143,48 @@ class Desktop:
         so that monitors are done in parallel.
         """
         monitors = self.monitors if not self.config.spanning else [self._master_monitor, ]
+        self._generate(monitors)
+
+    def refresh_wallpaper(self, monitors: Sequence[int] = (), regions: int = 0):
+        """
+        Redo some monitors, or some of the strips or swatches on them, over the last wallpaper. That is kept in
+        memory when this desktop made it, otherwise the current wallpaper is loaded, with its desktop filters.
+
+        :param monitors: Numbers of the monitors to redo, all of them if empty
+        :param regions: How many strips or swatches to redo on each monitor, 0 for the whole monitor
+        """
+        if self.composite is not None:
+            self.canvas = self.composite
+        else:
+            self.load_current_wallpaper()
+        if self.config.spanning:
+            targets = [self._master_monitor, ]
+        else:
+            targets = [m for m in self.monitors if not monitors or m.monitor_number in monitors]
+        self._generate(targets, regions, self.blank)
+
+    def _generate(self, monitors: Sequence[Monitor], regions: int = 0, blank=None):
         with ThreadPoolExecutor() as executor:
             for m in monitors:
-                m.set_monitor_config(self.wallpaper_config.monitors.get(str(m.monitor_number), self.config))
-                m.set_bg_image(self.bg_image)
-                executor.submit(m.generate_wallpaper)
-
+                m.set_monitor_config(self.wallpaper_config.monitors.get(str(m.monitor_number), self.config),
+                                     self.wallpapers)
+                overlay = self.canvas.overlay(m.size) if m.config.stack_mode else None
+                m.set_bg_image(self.canvas.buffer(tuple(m.physical)), clear=blank is None, overlay=overlay)
+                executor.submit(m.generate_wallpaper, regions=regions, blank=blank)
+
+        self.canvas.release_overlays()
+        self.wallpapers += 1
+        if tile_cache.Tiles:
+            logger.info('Tile cache: %s', tile_cache.Tiles.stats())
+        self.composite = self.canvas
         self.set_wallpaper()
 
     def set_wallpaper_from_image(self, path_to_image: str):
         pass
+
+    def close(self):
+        """
+        Stop the monitors' workers, when this desktop is being replaced
+        """
+        for m in (*self.monitors, self._master_monitor):
+            m.close()
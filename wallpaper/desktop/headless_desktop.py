@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+
+from PIL import Image
+
+from wallpaper.monitor.virtual import get_monitors
+from wallpaper.tools.encoder import EncodeResult
+from .desktop import Desktop
+
+logger = logging.getLogger(__name__)
+
+
+class HeadlessDesktop(Desktop):
+    """
+    Renders to `output_file` without a display. Monitors come from `virtual_monitors` in the config, no Tk or
+    platform APIs are touched.
+    """
+
+    def get_monitors(self):
+        return get_monitors(self.config.virtual_monitors)
+
+    def load_current_wallpaper(self):
+        """
+        Stack on top of the last file we wrote, if there is one
+        """
+        if not os.path.exists(self.config.output_file):
+            return
+        try:
+            with Image.open(self.config.output_file) as img:
+                self.canvas.load(img)
+        except Exception:
+            logger.exception('LoadCurrent')
+
+    def write(self, image: Image.Image) -> EncodeResult:
+        """
+        Write the image. The format follows the extension unless `output_format` says otherwise
+        """
+        return self.encoder.write(image, self.config.output_file)
+
+    def set_wallpaper(self):
+        super().set_wallpaper()
+        self.write(self.bg_image)
+
+    def set_wallpaper_from_image(self, path_to_image: str):
+        with Image.open(path_to_image) as img:
+            self.write(img)
@@ -8,7 +8,7 @@ import shutil
 from AppKit import NSScreen, NSRect, NSURL, NSWorkspace, NSImageScaling, NSWorkspaceDesktopImageOptionKey
 from PIL import Image
 
-from wallpaper.filters.wallpaper_filter import WallpaperFilter
+from wallpaper.filters.filter_chain import compile_filters
 from .desktop import Desktop
 
 
@@ -19,18 +19,19 @@ class OSX_Desktop(Desktop):
     """
     OSX specific desktop
     """
+    OutputFormats = ('JPEG', 'PNG', 'TIFF')
     def __init__(self, config):
         super().__init__(config)
         self._root_path = pathlib.Path('~/Library/Application Support/pywallpaper').expanduser()
 
     def _load_wallpapers(self):
         path = self._root_path
-        if not path.exists() or not list(path.glob('*_[0-9].jpg')):
+        if not path.exists() or not list(path.glob(f'*_[0-9]{self.encoder.extension()}')):
             path.mkdir(exist_ok=True)
         monitors = self.monitors
         for i, monitor in enumerate(monitors):
             # Make blank placeholder images
-            image_path = (path / f'pywallpaper_{i}.jpg')
+            image_path = (path / f'pywallpaper_{i}{self.encoder.extension()}')
             img = Image.new('RGB', tuple(monitor.size))
             if image_path.exists():
                 # Paste existing images to blank image, in case monitor size is different.
@@ -46,23 +47,24 @@ class OSX_Desktop(Desktop):
             for i, m in enumerate(monitors):
                 logger.info("%s: %s", i, m)
                 m.set_monitor_config(self.wallpaper_config.monitors.get(str(m.monitor_number), self.config))
-                m.set_bg_image(Image.open(self._root_path / f'pywallpaper_{i}.jpg'))
+                m.set_bg_image(Image.open(self._root_path / f'pywallpaper_{i}{self.encoder.extension()}'))
                 executor.submit(m.generate_wallpaper)
         self.set_wallpaper()
 
     def set_wallpaper(self):
         for i, screen in enumerate(NSScreen.screens()):
             wallpaper = self.monitors[i].bg_image
-            for image_filter in self.config.desktop_filters:
-                wallpaper = WallpaperFilter.get_filter(image_filter)(wallpaper)
+            wallpaper = compile_filters(self.config.desktop_filters)(wallpaper)
 
-            wallpaper_path = (self._root_path / f'pywallpaper_{i}.jpg')
-            wallpaper.convert('RGB').save(wallpaper_path)
+            wallpaper_path = (self._root_path / f'pywallpaper_{i}{self.encoder.extension()}')
+            written = self.encoder.write(wallpaper, str(wallpaper_path)).written
             wallpaper.close()
+            if not written:
+                continue
 
             # OSX doesn't reload the desktop if the filename doesn't change...
             # So make a temporary name and set it then set it again with the name we want.
-            temp_name = self._root_path / f'{str(uuid.uuid4())}.jpg'
+            temp_name = self._root_path / f'{str(uuid.uuid4())}{self.encoder.extension()}'
             try:
                 original = os.readlink(wallpaper_path)
                 shutil.move(original, temp_name)
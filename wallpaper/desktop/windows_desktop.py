@@ -21,6 +21,7 @@ class WindowsDesktop(Desktop):
     """
     Windows Features
     """
+    OutputFormats = ('JPEG', 'PNG', 'BMP')
 
     def load_current_wallpaper(self):
         """
@@ -32,7 +33,7 @@ class WindowsDesktop(Desktop):
             i = winreg.OpenKey(r, bgKey)
             wp = winreg.QueryValueEx(i, 'Wallpaper')
             img = Image.open(wp[0])
-            self.bg_image.paste(img, (0, 0))
+            self.canvas.load(img)
         except:
             logger.exception('LoadCurrent')
 
@@ -91,9 +92,9 @@ class WindowsDesktop(Desktop):
         self.set_wallpaper_style()
         # Save the new wallpaper in our current directory.
         new_path = os.getcwd()
-        new_path = os.path.join(new_path, 'pywallpaper.jpg')
-        self.bg_image.convert('RGB').save(new_path, 'JPEG', quality=90)
-        self.set_wallpaper_from_image(new_path)
+        new_path = os.path.join(new_path, f'pywallpaper{self.encoder.extension()}')
+        if self.encoder.write(self.bg_image, new_path).written:
+            self.set_wallpaper_from_image(new_path)
 
     def set_wallpaper_style(self):
         """
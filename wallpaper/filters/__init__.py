@@ -1,7 +1,3 @@
 # -*- coding: utf-8 -*-
-from . import border
-from . import fade_to_grey
-from . import sepia
-# from . import rm_background
-from . import tunnel
+# Filter modules are imported the first time one of their filters is asked for, see WallpaperFilter.Modules
 from . import wallpaper_filter
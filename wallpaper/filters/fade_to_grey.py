@@ -1,11 +1,8 @@
 # -*- coding: utf-8 -*-
-from PIL import Image
+from .wallpaper_filter import ColourMatrixFilter
 
-from .wallpaper_filter import WallpaperFilter
-from ..geom.point import Point
 
-
-class FadeToGrey(WallpaperFilter):
-    def _filter(self, image: Image.Image, _monitor: 'Monitor', _position: Point) -> Image.Image:
-        image = image.convert('RGB').convert('L')
-        return image
+class FadeToGrey(ColourMatrixFilter):
+    # ITU-R 601-2 luma, the same weights as convert('L')
+    matrix = (0.299, 0.587, 0.114, 0)
+    output_mode = 'L'
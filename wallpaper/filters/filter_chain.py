@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+import functools
+import logging
+from typing import Sequence
+
+from PIL import Image
+
+from wallpaper.geom.point import Point
+from .wallpaper_filter import WallpaperFilter, ColourMatrixFilter, LookupFilter
+
+logger = logging.getLogger(__name__)
+
+
+def _matrix_rows(filter_: ColourMatrixFilter) -> list[tuple[float, ...]]:
+    m = filter_.matrix
+    return [tuple(m[i:i + 4]) for i in range(0, len(m), 4)]
+
+
+def can_clip(filter_: ColourMatrixFilter) -> bool:
+    """
+    Whether some input colour takes an output channel of the matrix outside 0..255
+    """
+    for *coefficients, offset in _matrix_rows(filter_):
+        low = offset + 255 * sum(min(c, 0) for c in coefficients)
+        high = offset + 255 * sum(max(c, 0) for c in coefficients)
+        if low < 0 or high > 255:
+            return True
+    return False
+
+
+def fuse_matrices(first: ColourMatrixFilter, second: ColourMatrixFilter) -> ColourMatrixFilter:
+    """
+    One matrix filter doing `first` then `second`. Only right when `first` never clips, as the fused matrix
+    clips once at the end. Even then the result can differ by a level, as `first` isn't rounded on its own.
+    """
+    a = _matrix_rows(first)
+    matrix = []
+    for row in _matrix_rows(second):
+        coefficients = [sum(row[j] * a[j][k] for j in range(3)) for k in range(3)]
+        offset = sum(row[j] * a[j][3] for j in range(3)) + row[3]
+        matrix.extend((*coefficients, offset))
+    fused = ColourMatrixFilter()
+    fused.matrix = tuple(matrix)
+    fused.output_mode = second.output_mode
+    return fused
+
+
+def fuse_lookups(first: LookupFilter, second: LookupFilter) -> LookupFilter:
+    """
+    One lookup filter doing `first` then `second`, exactly
+    """
+    a, b = first.lut, second.lut
+    fused = LookupFilter()
+    fused.lut = [b[(i // 256) * 256 + a[i]] for i in range(min(len(a), len(b)))]
+    return fused
+
+
+class FilterChain:
+    """
+    An execution plan for a list of filter names.
+
+    Unknown names are dropped, and runs of adjacent colour matrix or lookup filters are fused into
+    one pass each, so a long chain of point operations costs a single image copy. A matrix that can clip
+    (sepia can) isn't fused with the next, as clipping part way through changes the result.
+    Build these with `compile_filters`, which caches plans by filter list.
+    """
+
+    def __init__(self, names: Sequence[str]):
+        self.names = tuple(names)
+        self.steps: list[WallpaperFilter] = []
+        for name in self.names:
+            image_filter = WallpaperFilter.load(name)
+            if image_filter is None:
+                logger.warning('Unknown filter: %s', name)
+                continue
+            self._append(image_filter)
+
+    def _append(self, image_filter: WallpaperFilter):
+        previous = self.steps[-1] if self.steps else None
+        if (isinstance(previous, ColourMatrixFilter) and isinstance(image_filter, ColourMatrixFilter)
+                and previous.output_mode == image_filter.input_mode and not can_clip(previous)):
+            self.steps[-1] = fuse_matrices(previous, image_filter)
+        elif (isinstance(previous, LookupFilter) and isinstance(image_filter, LookupFilter)
+                and len(previous.lut) == len(image_filter.lut)):
+            self.steps[-1] = fuse_lookups(previous, image_filter)
+        else:
+            self.steps.append(image_filter)
+
+    def __call__(self, image: Image.Image, monitor: 'Monitor' | None = None,
+                 position: Point | tuple | None = None) -> Image.Image:
+        for step in self.steps:
+            image = step(image, monitor, position)
+        return image
+
+    @property
+    def deterministic(self) -> bool:
+        return all(step.deterministic for step in self.steps)
+
+    @property
+    def uses_position(self) -> bool:
+        return any(step.uses_position for step in self.steps)
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def __repr__(self) -> str:
+        return f'<FilterChain {self.names} -> {[type(s).__name__ for s in self.steps]}>'
+
+
+@functools.lru_cache(maxsize=64)
+def _compile(names: tuple[str, ...]) -> FilterChain:
+    return FilterChain(names)
+
+
+def compile_filters(names: Sequence[str]) -> FilterChain:
+    """
+    The (cached) execution plan for a configured filter list
+    """
+    return _compile(tuple(names))
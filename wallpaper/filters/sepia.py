@@ -1,22 +1,10 @@
 # -*- coding: utf-8 -*-
-import itertools
+from .wallpaper_filter import ColourMatrixFilter
 
-from PIL import Image
 
-from wallpaper.geom.point import Point
-from .wallpaper_filter import WallpaperFilter
-
-
-
-class Sepia(WallpaperFilter):
-    def _filter(self, image: Image.Image, _monitor: 'Monitor', _position: Point) -> Image.Image:
-        width, height = image.size
-
-        pixels = image.load()
-        for py, px in itertools.product(range(height), range(width)):
-            r, g, b, a = image.getpixel((px, py))
-            tr = min(255, int(0.393 * r + 0.769 * g + 0.189 * b))
-            tg = min(255, int(0.349 * r + 0.686 * g + 0.168 * b))
-            tb = min(255, int(0.272 * r + 0.534 * g + 0.131 * b))
-            pixels[px, py] = (tr, tg, tb, a)
-        return image
+class Sepia(ColourMatrixFilter):
+    matrix = (
+        0.393, 0.769, 0.189, 0,
+        0.349, 0.686, 0.168, 0,
+        0.272, 0.534, 0.131, 0,
+    )
@@ -13,6 +13,7 @@ logger = logging.getLogger(__name__)
 
 
 class Tunnel(WallpaperFilter):
+    uses_position = True
 
     @staticmethod
     def _centroid(size) -> Point:
@@ -44,8 +45,10 @@ class Tunnel(WallpaperFilter):
 
 
 class Jiggle(WallpaperFilter):
+    deterministic = False
 
     def _filter(self, image: Image.Image, monitor: 'Monitor', position: Point) -> Image.Image:
-        angle = 20 * random.random() - 10.0
+        rng = monitor.tile_random(position) if monitor is not None and position is not None else random
+        angle = 20 * rng.random() - 10.0
         image = image.rotate(angle, expand=True, fillcolor=(0, 0, 0, 0))
         return image
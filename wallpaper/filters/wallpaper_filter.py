@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 from abc import ABCMeta, abstractmethod
+import importlib
 import logging
 
 from PIL import Image
@@ -14,9 +15,25 @@ class WallpaperFilter(metaclass=ABCMeta):
     """
     Base class for image filter. This can be a small image or the entire desktop
 
-    Subclassers should override the protected `_filter` method
+    Subclassers should override the protected `_filter` method, and declare the mode they need (`input_mode`,
+    None for any) and the mode they produce (`output_mode`, None for the same as the input).
+    Filters whose output varies from run to run set `deterministic = False`, and filters that look at the
+    position or monitor set `uses_position = True`, so their results are cached correctly.
     """
     Filters = {}
+    # Filter name: the module defining it, imported the first time the filter is asked for.
+    # New filter modules need an entry here (and in wallpaper.spec's hiddenimports)
+    Modules = {
+        'border': 'border',
+        'fadetogrey': 'fade_to_grey',
+        'sepia': 'sepia',
+        'tunnel': 'tunnel',
+        'jiggle': 'tunnel',
+    }
+    input_mode: str | None = None
+    output_mode: str | None = None
+    deterministic: bool = True
+    uses_position: bool = False
 
     @staticmethod
     def register(cls):
@@ -27,15 +44,29 @@ class WallpaperFilter(metaclass=ABCMeta):
 
     @staticmethod
     def list_filters():
-        return list(WallpaperFilter.Filters.keys())
+        return list(dict.fromkeys([*WallpaperFilter.Modules, *WallpaperFilter.Filters]))
+
+    @staticmethod
+    def load(filter_name: str) -> WallpaperFilter | None:
+        """
+        The registered filter, importing its module if it hasn't been yet. None if there's no such filter
+        """
+        module = WallpaperFilter.Modules.get(filter_name)
+        if filter_name not in WallpaperFilter.Filters and module:
+            try:
+                importlib.import_module(f'{__package__}.{module}')
+            except Exception:
+                logger.exception('Cannot import filter %s', filter_name)
+        return WallpaperFilter.Filters.get(filter_name)
 
     @staticmethod
     def get_filter(filter_name: str) -> WallpaperFilter | DummyFilter:
-        return WallpaperFilter.Filters.get(filter_name, DummyFilter())
+        return WallpaperFilter.load(filter_name) or DummyFilter()
 
-    def __init_subclass__(cls, **kwargs):
+    def __init_subclass__(cls, register: bool = True, **kwargs):
         super().__init_subclass__(**kwargs)
-        WallpaperFilter.register(cls)
+        if register:
+            WallpaperFilter.register(cls)
 
     def __call__(self, image: Image.Image, monitor: 'Monitor' | None = None, position: Point | tuple | None = None) -> Image.Image:
         """
@@ -69,6 +100,47 @@ class WallpaperFilter(metaclass=ABCMeta):
         return (x + d, y + d), (w - d, h - d)
 
 
+class ColourMatrixFilter(WallpaperFilter, register=False):
+    """
+    A filter expressed as a colour matrix, run in one pass by Pillow's matrix conversion.
+
+    Subclassers set `matrix`, a 12-tuple (RGB -> RGB) or a 4-tuple (RGB -> L) of
+    coefficients and offsets, and `output_mode` to match. Results are clipped to 0..255 and alpha is kept
+    for RGB output.
+    """
+    matrix: tuple[float, ...] = (1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0)
+    input_mode = 'RGB'
+    output_mode = 'RGB'
+
+    def _filter(self, image: Image.Image, _monitor: 'Monitor', _position: Point) -> Image.Image:
+        alpha = image.getchannel('A') if image.mode in ('RGBA', 'LA') and self.output_mode == 'RGB' else None
+        if image.mode != self.input_mode:
+            image = image.convert(self.input_mode)
+        image = image.convert(self.output_mode, self.matrix)
+        if alpha is not None:
+            image.putalpha(alpha)
+        return image
+
+
+class LookupFilter(WallpaperFilter, register=False):
+    """
+    A filter expressed as a per-channel lookup table, run in one pass by `Image.point`.
+
+    Subclassers set `lut`, 256 entries per channel (R, G, B then A if present). Alpha is left alone
+    when the table only covers the colour channels, and single band images use the first table.
+    """
+    lut: list[int] = list(range(256)) * 3
+
+    def _filter(self, image: Image.Image, _monitor: 'Monitor', _position: Point) -> Image.Image:
+        bands = len(image.getbands())
+        lut = self.lut
+        if bands == 1:
+            lut = lut[:256]
+        elif bands == 4 and len(lut) == 768:
+            lut = lut + list(range(256))
+        return image.point(lut)
+
+
 class DummyFilter:
     def __call__(self, image: Image.Image, monitor: 'Monitor', position: Point) -> Image.Image:
         return image
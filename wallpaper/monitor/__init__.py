@@ -1,13 +1,18 @@
 # -*- coding: utf-8 -*-
+import sys
 
-import platform
-this_platform = platform.platform().lower()
+from .monitor import Monitor
 
-if this_platform.startswith('windows'):
-    from .windows import get_monitors
-elif this_platform.startswith('macos'):
-    from .osx import get_monitors
-else:
-    from .generic import get_monitors
 
-from .monitor import Monitor
+def get_monitors(*args, **kwargs):
+    """
+    The monitors attached to this machine. The platform backend (and tkinter, win32 or AppKit) is only
+    imported the first time this is called, so headless runs never pay for it.
+    """
+    if sys.platform == 'win32':
+        from .windows import get_monitors as platform_monitors
+    elif sys.platform == 'darwin':
+        from .osx import get_monitors as platform_monitors
+    else:
+        from .generic import get_monitors as platform_monitors
+    return platform_monitors(*args, **kwargs)
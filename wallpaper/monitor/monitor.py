@@ -2,23 +2,37 @@
 import heapq
 import logging
 import random
-import threading
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from functools import total_ordering
-from typing import Generator, Union, Optional, List
+from typing import Callable, Generator, Union, Optional, List
 
 from PIL import Image, ImageDraw, ImageFilter
 
 from wallpaper.config import MonitorConfig
-from wallpaper.filters.wallpaper_filter import WallpaperFilter
+from wallpaper.filters.filter_chain import compile_filters
 from wallpaper.geom.point import Point
 from wallpaper.geom.rect import Rect
 from wallpaper.geom.size import Size
+from wallpaper.tools.bounded_executor import BoundedExecutor, image_bytes
 from wallpaper.tools.directory_tools import get_new_image, expand_dirs_lite, choose_dir_lite, flush_walls
+from wallpaper.tools.draft_image import draft_image
+from wallpaper.tools.perf import Counters
+from wallpaper.tools.prefetch import Prefetcher
+from wallpaper.tools.region_lock import RegionLock
+from .render import TileMonitor, render_tile, render_in_process, tile_random
 
 logger = logging.getLogger(__name__)
 
 
+def blend_opaque(background: Image.Image, image: Image.Image, ratio: float) -> Image.Image:
+    """
+    `Image.blend(background, image, ratio)` for an opaque background without an alpha band of its own
+    """
+    blended = Image.blend(background, image.convert(background.mode), ratio)
+    blended.putalpha(image.getchannel('A').point([round(a * ratio + 255 * (1 - ratio)) for a in range(256)]))
+    return blended
+
+
 # noinspection PyBroadException
 @total_ordering
 class Monitor:
@@ -26,9 +40,9 @@ class Monitor:
     A monitor and its extents
     """
 
-    # Monitors on the same desktop share a single bg_image (unless stack_mode), so pasting
-    # into it must be serialized across all Monitor instances/threads, not just per-instance.
-    _bg_image_lock = threading.Lock()
+    # Tiles are pasted from several worker threads, and mirrored monitors share a canvas buffer, so pasting
+    # into overlapping parts of an image must be serialized across all Monitor instances/threads.
+    _bg_regions = RegionLock()
 
     def __init__(self, monitor, physical, working, flags, monitorNumber):
         logger.info('__init__(%s, %s, %s, %s, %s)', monitor, physical, working, flags, monitorNumber)
@@ -62,6 +76,20 @@ class Monitor:
         self.__bg_image = None
         self.bg_image = None
         self.__workers = ThreadPoolExecutor()
+        # Every tile waiting for a worker holds its image, so only let so many queue up
+        self.__submitter = BoundedExecutor(self.__workers, self.config.max_pending_tiles,
+                                           self.config.max_pending_mb * 2 ** 20)
+        # The pool outlives a wallpaper (a daemon makes many), so wait on what was submitted rather than shutting it
+        self.__pending: list[Future] = []
+        self._prefetcher: Prefetcher | None = None
+        self.seed: int | str | None = None
+        self.rng = random.Random()
+        self.pick_rng = random.Random()
+        # Refreshes pick regions from their own generator, seeded once, so each refresh redoes different ones
+        self.region_rng = random.Random()
+        self._region_seed = None
+        # The fill mode and regions of the last wallpaper drawn, so a refresh redoes regions that line up with it
+        self.layout: tuple[str, list[Rect]] | None = None
 
     @property
     def size(self):
@@ -116,17 +144,38 @@ class Monitor:
             return self.physical.left < other.physical.left
         return self.physical.top < other.physical.top
 
-    def set_monitor_config(self, config: MonitorConfig):
+    def set_monitor_config(self, config: MonitorConfig, wallpaper: int = 0):
         """
         Configurate ourselvezz
+
+        :param wallpaper: How many wallpapers this process has made before. A seeded run always makes the same
+            first wallpaper, later ones (from a daemon) carry on from the seed rather than repeating it
         """
         self.config = config
         logger.info('Config is %s', self.config.__dict__)
+        seed = config.seed
+        self.seed = seed if seed is None or not wallpaper else f'{seed}:{wallpaper}'
+        # Layout and image choice draw from separate generators, as the prefetcher picks images on its own thread
+        self.rng = random.Random(None if self.seed is None else f'{self.seed}:{self.monitor_number}')
+        self.pick_rng = random.Random(None if self.seed is None else f'{self.seed}:{self.monitor_number}:pick')
+        if seed is not None and seed != self._region_seed:
+            self.region_rng = random.Random(f'{seed}:{self.monitor_number}:regions')
+            self._region_seed = seed
+        self.path = None
+        self.image_list = set()
         self.dirs = expand_dirs_lite(self.config.directories)
+        self.__submitter.max_jobs = config.max_pending_tiles
+        self.__submitter.max_bytes = config.max_pending_mb * 2 ** 20
+
+    def tile_random(self, position: Point | tuple) -> random.Random:
+        """
+        Randomness for a single tile, reproducible under a seed whichever worker renders it
+        """
+        return tile_random(self.seed, self.monitor_number, position)
 
     def choose_dir(self, dirs):
         if not self.path or not self.config.single_folder_mode:
-            self.path = choose_dir_lite(dirs)
+            self.path = choose_dir_lite(dirs, self.pick_rng)
             logger.info('Path: %s', self.path)
         return self.path
 
@@ -140,30 +189,28 @@ class Monitor:
         :param sizer: The resize method
         """
         try:
-            if self.config.stack_mode and random.random() < 0.33:
-                return
-
             if any(s < self.config.stop_threshold for s in size):
                 return
 
-            try:
-                image = image.convert("RGBA").resize(size, sizer)
-            except Exception:
-                logging.error("%s is corrupt: %s", image.filename, size)
+            if self.config.render_backend == 'process':
+                image = render_in_process(image, size, sizer, self.config.image_filters,
+                                          TileMonitor(self.size, self.monitor_number, self.seed), position)
+            else:
+                image = render_tile(image, size, sizer, self.config.image_filters, self, position)
+            if image is None:
                 return
 
-            for image_filter in self.config.image_filters:
-                logger.info('Filter: %s', image_filter)
-                image = WallpaperFilter.get_filter(image_filter)(image, self, position)
-
-            with self._bg_image_lock:
+            x, y = position
+            box = (x, y, x + image.width, y + image.height)
+            # Only this box is held, so non-overlapping pastes and blends run alongside each other
+            with Counters.timed('composite'), self._bg_regions.hold(self.bg_image, box):
                 if self.config.blending:
-                    x, y = position
-                    w, h = size
-                    box = (x, y, x + w, y + h)
                     img1 = self.bg_image.crop(box)
-                    image = Image.blend(img1, image, self.config.blend_ratio)
-                self.bg_image.paste(image, tuple(position), mask=image)
+                    if img1.mode == 'RGBA':
+                        image = Image.blend(img1, image, self.config.blend_ratio)
+                    else:
+                        image = blend_opaque(img1, image, self.config.blend_ratio)
+                self.bg_image.paste(image, (x, y), mask=image)
         except:
             logger.exception('put_image_at: %s', (image, position, size, sizer))
 
@@ -243,10 +290,10 @@ class Monitor:
 
         low_w = self.size.width // 4
         low_h = self.size.height // 4
-        first_w = random.randint(low_w, self.size.width)
-        first_h = random.randint(low_h, self.height)
-        x = random.randint(0, self.size.width - first_w)
-        y = random.randint(0, self.size.height - first_h)
+        first_w = self.rng.randint(low_w, self.size.width)
+        first_h = self.rng.randint(low_h, self.height)
+        x = self.rng.randint(0, self.size.width - first_w)
+        y = self.rng.randint(0, self.size.height - first_h)
         region = Rect(Point(x, y), Size(first_w, first_h))
 
         regions = root - region
@@ -261,16 +308,16 @@ class Monitor:
             low_h = max(region.h // 4, self.config.stop_threshold)
             if low_h > region.h or low_w > region.w:
                 continue
-            first_w = random.randint(low_w, region.w)
-            first_h = random.randint(low_h, region.h)
+            first_w = self.rng.randint(low_w, region.w)
+            first_h = self.rng.randint(low_h, region.h)
             if first_w == region.w:
                 x = region.left
             else:
-                x = random.randint(region.left, region.right - first_w)
+                x = self.rng.randint(region.left, region.right - first_w)
             if first_h == region.h:
                 y = region.top
             else:
-                y = random.randint(region.top, region.bottom - first_h)
+                y = self.rng.randint(region.top, region.bottom - first_h)
             rect = Rect(Point(x, y), Size(first_w, first_h))
             swatches.append(rect)
             results = region - rect
@@ -281,27 +328,60 @@ class Monitor:
             count += 1
         return swatches
 
-    def build_strips(self):
+    def build_strips(self, regions: int = 0, blank: Callable[[tuple], Image.Image] | None = None):
         """
         Build fillable strips and fill them
+
+        :param regions: Only fill this many of them, chosen at random from the last layout, 0 for all
+        :param blank: Clears a box of the desktop before it's filled again, when drawing over an old wallpaper
         """
         strips = []
         fill_mode = self.config.fill_mode
-        if fill_mode == 'strip':
-            strips = self.make_strips()
-        elif fill_mode == 'spiral':
-            strips = reversed(list(self.build_spiral()))
-        elif fill_mode == 'swatch':
-            strips = self.build_swatches()
+        if regions and self.layout and self.layout[0] == fill_mode:
+            strips = [strip.copy() for strip in self.layout[1]]
+        else:
+            with Counters.timed('layout'):
+                if fill_mode == 'strip':
+                    strips = self.make_strips()
+                elif fill_mode == 'spiral':
+                    strips = list(reversed(list(self.build_spiral())))
+                elif fill_mode == 'swatch':
+                    strips = self.build_swatches()
+            # Filling a strip shrinks it, keep the layout as it was
+            self.layout = (fill_mode, [strip.copy() for strip in strips])
+
+        if regions:
+            chosen = self.region_rng.sample(range(len(strips)), min(regions, len(strips)))
+            strips = [strips[i] for i in sorted(chosen)]
 
         for strip in strips:
             logger.info(strip)
+            if blank:
+                self.clear_region(strip, blank)
             self.build_collage(strip)
-            # Reset to a new dir
-            if self.config.reset_collage_folder:
+            # Reset to a new dir. The prefetcher owns folder choice, so leave it alone while one is running
+            if self.config.reset_collage_folder and not self._prefetcher:
                 self.path = None
 
+    def clear_region(self, rect: Rect, blank: Callable[[tuple], Image.Image]):
+        """
+        Put back what an empty wallpaper has under `rect`, so it can be filled again. Stack mode draws on a
+        fresh canvas of its own, so there is nothing to clear.
+        """
+        if self.config.stack_mode:
+            return
+        box = (rect.left, rect.top, rect.right, rect.bottom)
+        left, top = self.physical.left, self.physical.top
+        with self._bg_regions.hold(self.bg_image, box):
+            self.bg_image.paste(blank((box[0] + left, box[1] + top, box[2] + left, box[3] + top)), box[:2])
+            if self.config.blending:
+                ImageDraw.Draw(self.bg_image).rectangle((box[0], box[1], box[2] - 1, box[3] - 1), fill=self.bg_colour)
+
     def wait_for_workers(self):
+        pending, self.__pending = self.__pending, []
+        wait(pending)
+
+    def close(self):
         self.__workers.shutdown(wait=True)
 
     def place_image(self, image: Image.Image, rect: Rect) -> tuple:
@@ -323,7 +403,7 @@ class Monitor:
 
         # If there's space, choose whether to slide the image
         # left/right or up/down
-        slide = random.randint(0, 1)
+        slide = self.rng.randint(0, 1)
 
         if not slide:
             if max(dX, dY) == dX:
@@ -351,13 +431,16 @@ class Monitor:
         n_dirs = len(self.dirs)
         pixels4 = (rect.w * rect.h) // 4
 
+        if self._prefetcher:
+            return self.get_prefetched_image(pixels4)
+
         image = None
         while n_dirs and not image:
             path = self.choose_dir(self.dirs)
             if not path:
                 n_dirs = 0
                 continue
-            image = get_new_image(path, self.image_list)
+            image = get_new_image(path, self.image_list, tuple(rect.size), pixels4, rect.w / rect.h, self.pick_rng)
             if not image:
                 self.path = None
                 self.image_list = set()
@@ -368,8 +451,39 @@ class Monitor:
                 image = None
                 self.path = None
                 continue
+        if image:
+            self.image_list.add(image.info['filename'])
         return image
 
+    def get_prefetched_image(self, min_pixels: int) -> Image.Image | None:
+        """
+        Take the next prefetched candidate that is big enough
+        """
+        while True:
+            image = self._prefetcher.get()
+            if image is None or image.size[0] * image.size[1] >= min_pixels:
+                return image
+            image.close()
+
+    def _prefetch_candidate(self) -> Image.Image | None:
+        """
+        Producer for the prefetcher, runs on its thread. The rect isn't known yet, so only
+        images too small to ever be placed are skipped, and a cached level is read if it covers
+        the whole monitor, as every rect fits inside it.
+        """
+        while self.dirs:
+            path = self.choose_dir(self.dirs)
+            if not path:
+                return None
+            image = get_new_image(path, self.image_list, tuple(self.size), self.config.stop_threshold ** 2,
+                                  rng=self.pick_rng)
+            if image:
+                self.image_list.add(image.info['filename'])
+                return image
+            self.path = None
+            self.image_list = set()
+        return None
+
     def build_collage(self, rect: Rect):
         if not self.dirs:
             return
@@ -382,34 +496,55 @@ class Monitor:
         building = True
         while building:
             image = self.get_collage_image(rect)
-            self.image_list.add(image.info['filename'])
+            if image is None:
+                return
             position, size, sizer = self.place_image(image, rect)
             region = (image, position, size, sizer)
             building = ((rect.size.width > stop_threshold) and
                         (rect.size.height > stop_threshold))
             if building:
-                self.__workers.submit(self.put_image_at, *region)
+                self.submit_tile(*region)
 
-    def generate_wallpaper(self, fill_modes: tuple = ('strip', 'spiral', 'swatch')):
+    def generate_wallpaper(self, fill_modes: tuple = ('strip', 'spiral', 'swatch'), regions: int = 0,
+                           blank: Callable[[tuple], Image.Image] | None = None):
+        """
+        Fill our part of the desktop
+
+        :param regions: Only redo this many strips or swatches, for fill modes that have them
+        :param blank: Clears a box of the desktop, when drawing over an old wallpaper rather than an empty one
+        """
         stack_mode = self.config.stack_mode
         fill_mode = self.config.fill_mode
+        if fill_mode not in fill_modes:
+            regions = 0
+            self.layout = None
+        if blank and not regions:
+            self.clear_region(Rect(Point(0, 0), self.size), blank)
 
         if stack_mode:
+            @Counters.timed('background')
             def _blurBack(this):
                 try:
                     # BLUR = 11
                     BLUR = 5
-                    img = this.__bg_image.crop(this.physical).convert('RGBA').filter(ImageFilter.GaussianBlur(BLUR))
-                    for bg_filter in this.config.background_filters:
-                        img = WallpaperFilter.get_filter(bg_filter)(img, self, Point(0, 0))
-                    this.__bg_image.paste(img, (self.physical.left, self.physical.top))
+                    box = (0, 0, *this.__bg_image.size)
+                    with this._bg_regions.hold(this.__bg_image, box):
+                        img = this.__bg_image.convert('RGBA')
+                    img = img.filter(ImageFilter.GaussianBlur(BLUR))
+                    img = compile_filters(this.config.background_filters)(img, self, Point(0, 0))
+                    with this._bg_regions.hold(this.__bg_image, box):
+                        this.__bg_image.paste(img, (0, 0))
                 except:
                     logger.exception('Background filters')
 
-            self.__workers.submit(_blurBack, self)
+            # A copy to blur and the blurred result
+            self.__pending.append(self.__submitter.submit(_blurBack, self, weight=2 * image_bytes(self.__bg_image)))
+
+        if self.config.prefetch_depth > 0 and self.dirs and (fill_mode in fill_modes or fill_mode == 'collage'):
+            self._prefetcher = Prefetcher(self._prefetch_candidate, self.config.prefetch_depth).start()
         try:
             if fill_mode in fill_modes:
-                self.build_strips()
+                self.build_strips(regions, blank)
                 return
 
             if fill_mode == 'collage':
@@ -423,9 +558,13 @@ class Monitor:
         except:
             logging.exception('%s', self.monitor_number)
         finally:
+            if self._prefetcher:
+                self._prefetcher.close()
+                self._prefetcher = None
             self.wait_for_workers()
             if stack_mode:
-                self.__bg_image.paste(self.bg_image, (self.physical.left, self.physical.top), mask=self.bg_image)
+                with self._bg_regions.hold(self.__bg_image, (0, 0, *self.__bg_image.size)):
+                    self.__bg_image.paste(self.bg_image, (0, 0), mask=self.bg_image)
                 self.bg_image = self.__bg_image
             flush_walls()
 
@@ -435,7 +574,7 @@ class Monitor:
 
         :param path: A directory containing images
         """
-        image = get_new_image(path)
+        image = get_new_image(path, size=tuple(self.size), aspect=self.width / self.height, rng=self.pick_rng)
         if image:
             self.add_wallpaper(image)
             return True
@@ -482,9 +621,12 @@ class Monitor:
 
         return image
 
-    def set_bg_image(self, bgImage: Image.Image):
+    def set_bg_image(self, bgImage: Image.Image, clear: bool = True, overlay: Image.Image | None = None):
         """
-        Set the global desktop image
+        Set the image we draw on, covering just this monitor
+
+        :param clear: Blank it, when blending. Off when only parts of the monitor will be redone
+        :param overlay: Transparent layer for stack mode to draw on, made here if not given
         """
         self.bg_image = bgImage
 
@@ -495,19 +637,20 @@ class Monitor:
                               (self.blend_colour & 0xFF00) >> 8,
                               (self.blend_colour & 0xFF0000) >> 16)
 
-            draw = ImageDraw.Draw(self.bg_image)
-            draw.rectangle(self.physical, outline=self.bg_colour,
-                           fill=self.bg_colour)
+            if clear:
+                draw = ImageDraw.Draw(self.bg_image)
+                draw.rectangle((0, 0, self.bg_image.width - 1, self.bg_image.height - 1), outline=self.bg_colour,
+                               fill=self.bg_colour)
 
         if self.config.stack_mode:
             self.__bg_image = self.bg_image
-            self.bg_image = Image.new('RGBA', tuple(self.size), (0, 0, 0, 0))
+            self.bg_image = overlay or Image.new('RGBA', tuple(self.size), (0, 0, 0, 0))
 
     def centre_image(self, size: Size) -> tuple:
         w, h = size
         win_w, win_h = self.size
-        x = (win_w - w) / 2
-        y = (win_h - h) / 2
+        x = (win_w - w) // 2
+        y = (win_h - h) // 2
         return x, y
 
     def add_wallpaper(self, wallpaper: Union[str, Image.Image]):
@@ -516,10 +659,34 @@ class Monitor:
 
         if self.config.pre_rotate:
             if wallpaper.size[0] < wallpaper.size[1]:
+                # Rotating decodes the image, so draft it against the rotated monitor first
+                _scale, rotated_size = self._get_max_size(wallpaper, Size(self.height, self.width))
+                wallpaper = draft_image(wallpaper, rotated_size)
                 wallpaper = wallpaper.rotate(90, Image.Resampling.BICUBIC, expand=True)
 
-        position, size, sizer = self.place_image(wallpaper, Rect(Point(0, 0), self.size))
+        # place_image shrinks the rect it's given, so don't hand it our own size
+        position, size, sizer = self.place_image(wallpaper, Rect(Point(0, 0), Size(*self.size)))
         position = self.centre_image(size)
 
         region = (wallpaper, position, size, sizer)
-        self.__workers.submit(self.put_image_at, *region)
+        self.submit_tile(*region)
+
+    def submit_tile(self, image: Image.Image, position: Point | tuple, size: Size | tuple, sizer):
+        """
+        Hand an image to the workers to be placed. Stack mode randomly leaves gaps, decided here rather than
+        on the worker so a seeded run skips the same tiles.
+
+        Waits while too many tiles are already waiting, or with `pending_overflow` 'shed' drops this one.
+        The image is weighed at its full decoded size, before any drafting, plus the RGBA tile made from it.
+        """
+        if self.config.stack_mode and self.rng.random() < 0.33:
+            image.close()
+            return
+        weight = image_bytes(image) + size[0] * size[1] * 4
+        future = self.__submitter.submit(self.put_image_at, image, position, size, sizer, weight=weight,
+                                         block=self.config.pending_overflow != 'shed')
+        if future is None:
+            Counters.count('tiles_shed')
+            image.close()
+            return
+        self.__pending.append(future)
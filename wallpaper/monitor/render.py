@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+from dataclasses import dataclass
+import io
+import logging
+import random
+import threading
+from typing import Sequence
+
+from PIL import Image
+
+from wallpaper.filters.filter_chain import compile_filters
+from wallpaper.geom.point import Point
+from wallpaper.geom.size import Size
+from wallpaper.tools import mipmap_cache
+from wallpaper.tools.mipmap_cache import load_image
+from wallpaper.tools import tile_cache
+from wallpaper.tools.perf import Counters
+
+logger = logging.getLogger(__name__)
+
+_process_pool: 'ProcessPoolExecutor | None' = None
+_process_pool_lock = threading.Lock()
+
+
+@dataclass
+class TileMonitor:
+    """
+    The parts of a Monitor that filters look at, small enough to send to a worker process
+    """
+    size: Size
+    monitor_number: int
+    seed: int | str | None = None
+
+    def tile_random(self, position: Point | tuple) -> random.Random:
+        return tile_random(self.seed, self.monitor_number, position)
+
+
+def tile_random(seed: int | str | None, monitor_number: int, position: Point | tuple) -> random.Random:
+    """
+    A random source for one tile. Seeded by the run seed, monitor and position when there is a seed, so the
+    result doesn't depend on which worker renders the tile or when
+    """
+    if seed is None:
+        return random.Random()
+    x, y = position
+    return random.Random(f'{seed}:{monitor_number}:{x},{y}')
+
+
+def _init_worker(mipmap_budget: int, tile_budgets: tuple[int, int]):
+    """
+    Worker processes start without the parent's caches, set up the same ones
+    """
+    mipmap_cache.configure(mipmap_budget // 2 ** 20)
+    memory, disk = tile_budgets
+    tile_cache.configure(memory // 2 ** 20, disk // 2 ** 20)
+
+
+def get_process_pool() -> 'ProcessPoolExecutor':
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            # Imported here, multiprocessing is a noticeable part of startup and most runs use threads
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            # The pool starts from a worker thread, and a child forked while another thread holds a lock (logging,
+            # sqlite, a Pillow decoder) can deadlock. Start workers from a clean server process where there is one
+            context = None
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('forkserver')
+            mipmaps, tiles = mipmap_cache.Mipmaps, tile_cache.Tiles
+            _process_pool = ProcessPoolExecutor(
+                mp_context=context, initializer=_init_worker,
+                initargs=(mipmaps.cache.budget if mipmaps else 0,
+                          (tiles.memory_budget, tiles.disk_budget) if tiles else (0, 0))
+            )
+        return _process_pool
+
+
+@Counters.timed('render')
+def render_tile(image: Image.Image, size: tuple[int, int], sizer, image_filters: Sequence[str],
+                monitor, position: Point | tuple) -> Image.Image | None:
+    """
+    Decode, resize and filter an image, ready for pasting
+
+    :param image: The opened image
+    :param size: The final size
+    :param sizer: The resize method
+    :param image_filters: Names of the filters to apply
+    :param monitor: The Monitor (or TileMonitor) being rendered to
+    :param position: Where the image will be placed
+    """
+    chain = compile_filters(image_filters)
+    key = tile_cache.tile_key(image, size, sizer, chain, monitor, position) if tile_cache.Tiles else None
+    if key:
+        cached = tile_cache.Tiles.get(key)
+        if cached is not None:
+            image.close()
+            return cached
+
+    image = load_image(image, size)
+    try:
+        image = image.convert("RGBA").resize(size, sizer)
+    except Exception:
+        logger.error("%s is corrupt: %s", image.info.get('filename'), size)
+        return None
+
+    image = chain(image, monitor, position)
+    if key:
+        tile_cache.Tiles.put(key, image)
+    return image
+
+
+def _render_packed(source: bytes, info: dict, size: tuple[int, int], sizer, image_filters: Sequence[str],
+                   monitor: TileMonitor, position: tuple) -> tuple[str, tuple[int, int], bytes] | None:
+    """
+    Worker process side of `render_in_process`
+    """
+    image = Image.open(io.BytesIO(source))
+    image.info.update(info)
+    image = render_tile(image, size, sizer, image_filters, monitor, position)
+    if image is None:
+        return None
+    return image.mode, image.size, image.tobytes()
+
+
+def image_source(image: Image.Image, size: tuple[int, int]) -> tuple[bytes, dict] | None:
+    """
+    The encoded bytes behind an opened image, preferring a cached level that covers `size`.
+    None if the image has already been decoded or has no backing file.
+    """
+    if not getattr(image, 'tile', None):
+        return None
+    info = dict(image.info)
+    filename = info.get('filename')
+    path = info.get('mipmap')
+    if mipmap_cache.Mipmaps and filename and not path:
+        cached = mipmap_cache.Mipmaps.open(filename, size)
+        if cached:
+            path = cached.info['mipmap']
+            info.update(cached.info)
+            cached.close()
+
+    fp = getattr(image, 'fp', None)
+    if not path and isinstance(fp, io.BytesIO):
+        return fp.getvalue(), info
+    path = path or filename
+    if not path:
+        return None
+    with open(path, 'rb') as f:
+        return f.read(), info
+
+
+def render_in_process(image: Image.Image, size: tuple[int, int], sizer, image_filters: Sequence[str],
+                      monitor: TileMonitor, position: Point | tuple) -> Image.Image | None:
+    """
+    `render_tile` on the shared process pool. Filters in pure Python hold the GIL, so this
+    lets tiles render on every core. Falls back to rendering here if the image can't be shipped.
+    """
+    source = image_source(image, size)
+    if source is None:
+        return render_tile(image, size, sizer, image_filters, monitor, position)
+    image.close()
+    data, info = source
+    result = get_process_pool().submit(
+        _render_packed, data, info, tuple(size), sizer, list(image_filters), monitor, tuple(position)
+    ).result()
+    if result is None:
+        return None
+    mode, tile_size, pixels = result
+    return Image.frombytes(mode, tile_size, pixels)
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import re
+from typing import Sequence
+
+from wallpaper.monitor.monitor_rect import MonitorRect
+from .monitor import Monitor
+
+DEFAULT_LAYOUT = (MonitorRect(0, 0, 1920, 1080),)
+_MONITOR_SPEC = re.compile(r'^(\d+)x(\d+)(?:@(-?\d+),(-?\d+))?$')
+
+
+def parse_monitor(spec: str) -> MonitorRect:
+    """
+    Parse `WIDTHxHEIGHT[@LEFT,TOP]`, e.g. `1920x1080@-1920,0`
+    """
+    match = _MONITOR_SPEC.match(spec.strip())
+    if not match:
+        raise ValueError(f'Bad monitor {spec!r}, expected WIDTHxHEIGHT[@LEFT,TOP]')
+    width, height, left, top = (int(v) if v else 0 for v in match.groups())
+    return MonitorRect(left, top, left + width, top + height)
+
+
+def get_monitors(layout: Sequence[Sequence[int]] = DEFAULT_LAYOUT) -> Sequence[Monitor]:
+    """
+    Monitors for a virtual layout of (left, top, right, bottom) rects, the first being the primary.
+
+    The layout is shifted so the desktop starts at (0, 0), so monitors left of or above the primary, or straddling
+    its origin, land inside the composite image rather than being wrapped or split.
+    """
+    rects = [MonitorRect(*rect) for rect in layout or DEFAULT_LAYOUT]
+    dx = -min(r.left for r in rects)
+    dy = -min(r.top for r in rects)
+    return tuple(
+        Monitor('Virtual', rect, rect, 1 if number == 0 else 0, number)
+        for number, rect in enumerate(MonitorRect(r.left + dx, r.top + dy, r.right + dx, r.bottom + dy)
+                                      for r in rects)
+    )
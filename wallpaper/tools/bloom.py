@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import math
+import struct
+
+_HEADER = struct.Struct('<4sIIQ')
+_MAGIC = b'BLM1'
+
+
+class BloomFilter:
+    """
+    A set that can only answer "definitely not in" or "probably in", in a few bits per item.
+
+    :param capacity: Items it's sized for, the false positive rate climbs past this
+    :param error_rate: False positive rate at capacity
+    """
+
+    def __init__(self, capacity: int = 1000, error_rate: float = 0.01):
+        capacity = max(capacity, 1)
+        self.bits = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.capacity = capacity
+        self.count = 0
+        self.array = bytearray((self.bits + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode('utf-8', 'surrogateescape'), digest_size=16).digest()
+        h1, h2 = struct.unpack('<QQ', digest)
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    def add(self, item: str):
+        added = False
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self.array[byte] & (1 << bit):
+                self.array[byte] |= 1 << bit
+                added = True
+        self.count += added
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.array[p // 8] & (1 << (p % 8)) for p in self._positions(item))
+
+    @property
+    def full(self) -> bool:
+        return self.count > self.capacity
+
+    def to_bytes(self) -> bytes:
+        return _HEADER.pack(_MAGIC, self.bits, self.hashes, self.count) + bytes(self.array)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'BloomFilter':
+        magic, bits, hashes, count = _HEADER.unpack_from(data)
+        array = data[_HEADER.size:]
+        if magic != _MAGIC or len(array) != (bits + 7) // 8:
+            raise ValueError('Not a bloom filter')
+        bloom = cls.__new__(cls)
+        bloom.bits, bloom.hashes, bloom.count = bits, hashes, count
+        bloom.capacity = max(1, round(bits * math.log(2) / hashes))
+        bloom.array = bytearray(array)
+        return bloom
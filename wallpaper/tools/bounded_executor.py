@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from concurrent.futures import Executor, Future
+import threading
+from typing import Callable
+
+from PIL import Image
+
+from .perf import Counters
+
+
+def image_bytes(image: Image.Image) -> int:
+    return image.width * image.height * len(image.getbands())
+
+
+class BoundedExecutor:
+    """
+    Submits to an executor, but only while fewer than `max_jobs` jobs, weighing no more than `max_bytes` between
+    them, are queued or running. Past that `submit` waits for a job to finish, or turns the job away.
+    One job is always let through however much it weighs, so an oversized job can't wait forever.
+
+    :param executor: Runs the jobs
+    :param max_jobs: Jobs queued or running at once, 0 for no limit
+    :param max_bytes: Total weight of those jobs, 0 for no limit
+    """
+
+    def __init__(self, executor: Executor, max_jobs: int = 0, max_bytes: int = 0):
+        self.executor = executor
+        self.max_jobs = max_jobs
+        self.max_bytes = max_bytes
+        self.jobs = 0
+        self.bytes = 0
+        self.condition = threading.Condition()
+
+    def _full(self, weight: int) -> bool:
+        if not self.jobs:
+            return False
+        return bool((self.max_jobs and self.jobs >= self.max_jobs) or
+                    (self.max_bytes and self.bytes + weight > self.max_bytes))
+
+    def _release(self, weight: int):
+        with self.condition:
+            self.jobs -= 1
+            self.bytes -= weight
+            self.condition.notify_all()
+
+    def submit(self, fn: Callable, *args, weight: int = 0, block: bool = True, **kwargs) -> Future | None:
+        """
+        `Executor.submit`, once there is room
+
+        :param weight: What the job holds onto until it's done, such as the bytes of a decoded image
+        :param block: Wait for room, otherwise return None straight away when there is none
+        :return: The job's future, or None if it was turned away
+        """
+        with self.condition:
+            if self._full(weight):
+                if not block:
+                    return None
+                with Counters.timed('backpressure'):
+                    self.condition.wait_for(lambda: not self._full(weight))
+            self.jobs += 1
+            self.bytes += weight
+            Counters.peak('pending_bytes', self.bytes)
+        try:
+            future = self.executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release(weight)
+            raise
+        future.add_done_callback(lambda _: self._release(weight))
+        return future
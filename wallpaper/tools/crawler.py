@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+import logging
+import os
+import time
+from typing import Sequence
+
+from .file_cache import SQL_Cache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CrawlStats:
+    directories: int = 0
+    listed: int = 0
+    seconds: float = 0.0
+
+
+def _visit(catalogue: SQL_Cache, path: str, modified_time: float | None) -> tuple[list[tuple[str, float]], bool]:
+    """
+    Bring one directory up to date in the catalogue
+
+    :return: Its sub directories with their mtimes where known, and whether it had to be listed
+    """
+    if modified_time is None:
+        try:
+            modified_time = os.stat(path).st_mtime
+        except OSError:
+            return [], False
+    recorded = catalogue.recorded(path)
+    if recorded is not None and recorded[0] == modified_time:
+        # An unchanged directory can still have changed sub directories, so they are stat'ed (but not listed) again
+        return [(d, None) for d in recorded[1]], False
+    catalogue.set(path, None, modified_time)
+    entry = catalogue.lookup(path)
+    return [(d, entry.subdir_stats.get(d)) for d in entry.subdirs], True
+
+
+def crawl(roots: Sequence[str], catalogue: SQL_Cache, workers: int = 8) -> CrawlStats:
+    """
+    Bring every directory under `roots` up to date in the catalogue, in parallel.
+
+    Directories whose mtime matches the catalogue aren't listed again, only their sub directories are checked,
+    so a rescan of an unchanged library costs one stat per directory.
+
+    :param roots: Top level directories
+    :param catalogue: The directory catalogue to update
+    :param workers: Threads to crawl with, listing is I/O bound so this can be well above the core count
+    """
+    stats = CrawlStats()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='crawler') as executor:
+        pending = {executor.submit(_visit, catalogue, root, None) for root in roots}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    subdirs, listed = future.result()
+                except Exception:
+                    logger.exception('Crawling')
+                    continue
+                stats.directories += 1
+                stats.listed += listed
+                pending.update(executor.submit(_visit, catalogue, d, m) for d, m in subdirs)
+    stats.seconds = time.perf_counter() - start
+    logger.info('Crawled %s: %s', roots, stats)
+    return stats
@@ -1,6 +1,7 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import os
 
+# Extensions we look for, kept fixed so listing directories never makes Pillow load every plugin to ask it
 ImageExtensions = {'.png', '.jpg', '.jpeg', '.gif', '.fli', '.flc', '.fpx', '.gbr', '.gd', '.ico', '.im', '.pcd',
                    '.pcx', '.ppm', '.psd', '.sgi', '.tga', '.tiff', '.wal', '.xbm', '.xpm', '.bmp'}
 
@@ -10,19 +11,48 @@ class DirEntry:
     path: str
     _files: list[str] | None = None
     stat: float | None = None
+    _subdirs: list[str] | None = None
+    # mtimes of the sub directories, from the scan that found them
+    subdir_stats: dict[str, float] = field(default_factory=dict, compare=False, repr=False)
 
     @property
     def files(self) -> list[str]:
         """
         Delay loading of files until we care
         """
-        ops = os.path.splitext
-        opj = os.path.join
         if self._files is None:
-            root, _dirs, files = next(os.walk(self.path))
-            self._files = [opj(root, f) for f in files if ops(f)[1] in ImageExtensions]
-
+            self.scan()
         return self._files
 
+    @property
+    def subdirs(self) -> list[str]:
+        if self._subdirs is None:
+            self.scan()
+        return self._subdirs
+
+    def scan(self):
+        """
+        List the directory once with scandir, keeping image files, sub directories and the sub directories'
+        mtimes (which Windows hands over with the listing). Symlinked directories aren't followed.
+        """
+        files, subdirs, stats = [], [], {}
+        try:
+            with os.scandir(self.path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                            stats[entry.path] = entry.stat(follow_symlinks=False).st_mtime
+                        elif os.path.splitext(entry.name)[1].lower() in ImageExtensions:
+                            files.append(entry.path)
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+        if self._files is None:
+            self._files = sorted(files)
+        self._subdirs = sorted(subdirs)
+        self.subdir_stats = stats
+
     def __eq__(self, other) -> bool:
         return self.path == other.path and self.stat == other.stat
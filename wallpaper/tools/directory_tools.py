@@ -1,14 +1,19 @@
 # -*- coding: utf-8 -*-
-import collections
-import concurrent.futures
 import logging
 import os
-from random import randint, choice
+import random
+import threading
 from typing import Callable
 
-from PIL import Image
+from PIL import Image, UnidentifiedImageError
 
+from .crawler import crawl
 from .file_cache import DirectoryCache
+from .decorators import locked
+from .image_index import ImageIndex, MAX_BUCKET_DISTANCE, aspect_bucket
+from .mipmap_cache import open_image
+from .perf import Counters
+from .unseen_pool import DirectoryPool
 
 logger = logging.getLogger(__name__)
 
@@ -17,36 +22,21 @@ osPath = os.path
 # For quick filtering
 FileCache: DirectoryCache | None = None
 update: Callable | None = None
+Index: ImageIndex | None = None
 
 
 def flush_walls():
     FileCache.history.write_walls()
+    FileCache.flush()
+    Index.flush()
 
 
-def expand_dir_t(directory, newDirEntry):
+@Counters.timed('choose_dir')
+def choose_dir_lite(dirs, rng: random.Random = random) -> list:
     """
-    Expand dirs in a thread.
-
-    :param directory: Root directory
-    :param newDirEntry: Callback
+    Pick a directory. Roots starting with `+` are descended at random, through the catalogue
     """
-    dirM = collections.deque()
-    append = dirM.append
-    extensions = Image.registered_extensions()
-    try:
-        for root, dirs, files in os.walk(directory):
-            if files:
-                update(root, [os.path.join(root, f) for f in files if os.path.splitext(f)[-1].lower() in extensions])
-                append(root)
-        newDirEntry((directory, dirM))
-    except:
-        logging.exception('expand_dir_t')
-
-
-def choose_dir_lite(dirs) -> list:
-    extensions = Image.registered_extensions()
-
-    chosen = choice(dirs)
+    chosen = rng.choice(dirs)
     if not chosen.startswith('+'):
         return chosen
 
@@ -55,58 +45,128 @@ def choose_dir_lite(dirs) -> list:
     while True:
         logger.info('Root Choice: %s', chosen)
 
-        root, dirs, files = next(os.walk(chosen))
-        if files:
-            if not dirs or randint(1, 100) < 50:
-                d = update(osPath.join(root, chosen),
-                           [osPath.join(root, f) for f in files if os.path.splitext(f)[-1].lower() in extensions])
-                return d
-        if dirs:
-            chosen = osPath.join(root, choice(dirs))
+        entry = FileCache.get(chosen)
+        subdirs = entry.subdirs
+        if entry.files:
+            if not subdirs or rng.randint(1, 100) < 50:
+                return chosen
+        if subdirs:
+            chosen = rng.choice(subdirs)
         else:
             break
     return []
 
+
+crawled = set()
+
+
 def expand_dirs_lite(dirs):
-    global FileCache, update
+    """
+    Set up the catalogue, and bring it up to date for any roots we haven't crawled yet this run
+    """
+    global FileCache, update, Index
     if not FileCache:
         FileCache = DirectoryCache()
         update = FileCache.update
+        Index = ImageIndex()
+    roots = [d[1:] for d in dirs if d.startswith('+') and d[1:] not in crawled]
+    if roots and hasattr(FileCache, 'lookup'):
+        crawled.update(roots)
+        crawl(roots, FileCache)
     return dirs
 
+
 chosen = set()
+# Each directory's unseen images, with the file list they were drawn up from
+Pools: dict[str, tuple[list[str], DirectoryPool]] = {}
+PoolLock = threading.RLock()
+# Draws that can be turned down (unwanted or too small) before falling back to filtering the whole directory
+MAX_DRAWS = 16
+
 
-def get_new_image(directory: str, dont_want: set = None) -> Image.Image | None:
+def _pool(directory: str, files: list[str], cache) -> DirectoryPool:
+    """
+    The directory's pool, drawn up again when the directory has been listed again
+    """
+    source, pool = Pools.get(directory, (None, None))
+    if source is not files:
+        known = Index.get(directory)
+        pool = DirectoryPool(cache.get_available(files, chosen), lambda f: known[f].bucket if f in known else None)
+        Pools[directory] = (files, pool)
+    return pool
+
+
+@locked(PoolLock)
+def _claim(directory: str, files: list[str], cache, dont_want: set, min_pixels: int, aspect: float | None,
+           rng: random.Random) -> str | None:
+    """
+    Pick an unseen image and mark it as used. Draws from the directory's pool, so it costs the same for any size of
+    directory, unless most draws are turned down.
+    """
+    pool = _pool(directory, files, cache)
+    if not pool:
+        # Everything has been seen, start the directory over (from the next visit)
+        cache.remove_walls(files)
+        del Pools[directory]
+        return None
+
+    filename = None
+    target = aspect_bucket(aspect) if aspect and aspect > 0 else None
+    for _ in range(MAX_DRAWS):
+        candidate = pool.draw(rng, target, MAX_BUCKET_DISTANCE)
+        if candidate not in dont_want and Index.is_suitable(candidate, min_pixels):
+            filename = candidate
+            break
+    else:
+        available = Index.suitable(cache.get_available(files, dont_want.union(chosen)), min_pixels)
+        if aspect:
+            available = Index.closest_aspect(available, aspect)
+        if available:
+            filename = available[rng.randint(0, len(available) - 1)]
+
+    if filename is not None:
+        pool.discard(filename)
+        cache.add_wall(filename)
+        chosen.add(filename)
+    return filename
+
+
+@Counters.timed('select')
+def get_new_image(directory: str, dont_want: set = None, size: tuple[int, int] | None = None,
+                  min_pixels: int = 0, aspect: float | None = None,
+                  rng: random.Random = random) -> Image.Image | None:
     """
     Get a new image from a directory
 
     :param dont_want:
     :param directory: A directory full of files
+    :param size: The size of the space being filled, lets a cached smaller copy stand in for the original
+    :param min_pixels: Skip images the index knows are smaller than this
+    :param aspect: Prefer images with an aspect ratio (width / height) close to this
+    :param rng: Source of randomness, for reproducible runs
     """
     if dont_want is None:
         dont_want = set()
-    dont_want = dont_want.union(chosen)
 
     files = FileCache.get(directory).files
     if files:
         with FileCache.history as cache:
-            available_files = cache.get_available(files, dont_want)
-            if not available_files:
-                cache.remove_walls(files)
-                dont_want.update(files)
-                available_files = cache.get_available(files, dont_want)
-            tries = 0
-            while tries < 3 and available_files:
-                idx = randint(0, len(available_files) - 1)
-                filename = available_files[idx]
-                cache.add_wall(filename)
-                chosen.add(filename)
+            for _ in range(3):
+                filename = _claim(directory, files, cache, dont_want, min_pixels, aspect, rng)
+                if filename is None:
+                    break
                 try:
-                    image = Image.open(filename)
-                    image.draft('RGBA', image.size)
-                    image.info['filename'] = filename
+                    # Left unloaded: callers must draft_image() against the target size before decoding
+                    image = open_image(filename, size)
+                    if 'mipmap' not in image.info:
+                        Index.record(filename, image)
+                    Counters.count('images_opened')
                     return image
+                except (UnidentifiedImageError, Image.DecompressionBombError) as e:
+                    # Not an image we can use, and won't be until the file changes
+                    logger.warning('Unreadable %s: %s', filename, e)
+                    Index.record_unreadable(filename)
                 except Exception as e:
-                    available_files.remove(filename)
-                tries += 1
+                    # Could be a share that's slow or away, try it again another time
+                    logger.warning('Could not open %s: %s', filename, e)
     return None
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+
+from PIL import Image
+
+from wallpaper.tools.decorators import locked
+
+logger = logging.getLogger(__name__)
+
+
+class DiskCache:
+    """
+    A directory of cached images, bounded by a byte budget and evicted least recently used first.
+
+    Entries are keyed by an opaque string (normally a content hash) and indexed in a small sqlite db
+    inside the cache directory. Every process using the directory shares the budget, the total is read
+    back from the db whenever something is stored.
+
+    :param root: Directory holding the cached files
+    :param budget: Upper limit of bytes to keep on disk
+    """
+    CacheLock = threading.RLock()
+
+    def __init__(self, root: str | os.PathLike, budget: int):
+        self.root = pathlib.Path(root)
+        self.budget = budget
+        self.hits = 0
+        self.misses = 0
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.root / 'index.db'
+        self._setup_db()
+        db = self._db()
+        try:
+            self.total = db.execute('SELECT COALESCE(SUM(bytes), 0) FROM entries').fetchone()[0]
+        finally:
+            db.close()
+
+    def _db(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    def _setup_db(self):
+        db = self._db()
+        try:
+            db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    width INTEGER NOT NULL,
+                    height INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    last_used REAL NOT NULL);
+                CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used);
+                """
+            )
+        finally:
+            db.commit()
+            db.close()
+
+    @locked(CacheLock)
+    def find(self, prefix: str, min_size: tuple[int, int]) -> pathlib.Path | None:
+        """
+        Find the smallest entry whose key starts with `prefix` and covers `min_size`
+
+        :param prefix: Key prefix shared by a family of entries
+        :param min_size: Minimum (width, height)
+        """
+        width, height = min_size
+        db = self._db()
+        try:
+            row = db.execute(
+                'SELECT key, filename FROM entries WHERE key >= ? AND key < ? AND width >= ? AND height >= ? '
+                'ORDER BY width * height LIMIT 1', (prefix, prefix + '\uffff', width, height)
+            ).fetchone()
+            if not row:
+                self.misses += 1
+                return None
+            path = self.root / row[1]
+            if not path.exists():
+                self._remove(db, row[0], row[1])
+                self.misses += 1
+                return None
+            db.execute('UPDATE entries SET last_used = ? WHERE key = ?', (time.time(), row[0]))
+            self.hits += 1
+            return path
+        finally:
+            db.commit()
+            db.close()
+
+    @locked(CacheLock)
+    def put(self, key: str, image: Image.Image, lossless: bool = False):
+        """
+        Store an image. Images with alpha (or everything, if `lossless`) are kept as PNG, the rest as JPEG
+
+        :param key: Entry key
+        :param image: A loaded image
+        :param lossless: Never use JPEG
+        """
+        if lossless or 'A' in image.mode or 'transparency' in image.info:
+            filename, image_format, params = f'{key}.png', 'PNG', {'compress_level': 1}
+            if image.mode not in ('RGBA', 'LA', 'RGB', 'L'):
+                image = image.convert('RGBA')
+        else:
+            filename, image_format, params = f'{key}.jpg', 'JPEG', {'quality': 90}
+            image = image if image.mode in ('RGB', 'L') else image.convert('RGB')
+
+        path = self.root / filename
+        temp = path.with_suffix('.tmp')
+        image.save(temp, image_format, **params)
+        os.replace(temp, path)
+        size = path.stat().st_size
+
+        db = self._db()
+        try:
+            db.execute('INSERT OR REPLACE INTO entries (key, filename, width, height, bytes, last_used) '
+                       'VALUES (?, ?, ?, ?, ?, ?)', (key, filename, image.width, image.height, size, time.time()))
+            # Render worker processes share the directory, so count what they've added too
+            self.total = db.execute('SELECT COALESCE(SUM(bytes), 0) FROM entries').fetchone()[0]
+            self._evict(db)
+        finally:
+            db.commit()
+            db.close()
+
+    def _remove(self, db: sqlite3.Connection, key: str, filename: str):
+        row = db.execute('SELECT bytes FROM entries WHERE key = ?', (key,)).fetchone()
+        if row:
+            self.total -= row[0]
+        db.execute('DELETE FROM entries WHERE key = ?', (key,))
+        try:
+            (self.root / filename).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, db: sqlite3.Connection):
+        if self.total <= self.budget:
+            return
+        for key, filename in db.execute('SELECT key, filename FROM entries ORDER BY last_used').fetchall():
+            if self.total <= self.budget:
+                break
+            self._remove(db, key, filename)
+        logger.info('Evicted %s to %d bytes', self.root, self.total)
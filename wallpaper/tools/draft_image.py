@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Modes Image.reduce() averages correctly. Palette, bilevel and 16 bit modes either raise or average indices.
+REDUCIBLE_MODES = {'L', 'LA', 'La', 'RGB', 'RGBA', 'RGBa', 'RGBX', 'CMYK', 'YCbCr', 'LAB', 'HSV', 'I', 'F'}
+
+
+def draft_image(image: Image.Image, size: tuple[int, int]) -> Image.Image:
+    """
+    Shrink an image as cheaply as possible while still covering `size`.
+
+    JPEG (and friends) can decode directly at 1/2, 1/4 or 1/8 scale, so ask the decoder for the smallest scale
+    that is at least as big as the target. This only works before the image is loaded, so callers that need to
+    transform the image (e.g. pre-rotation) must draft it first. Formats without draft support, and images that
+    are already loaded, are reduced by an integer factor instead, which is still far cheaper than resampling
+    the full image. Modes that cannot be reduced are returned untouched for the resize to deal with.
+
+    :param image: A freshly opened (not yet loaded) image
+    :param size: The final size the image will be resized to
+    :return: The (possibly) reduced image, with `info` preserved
+    """
+    width, height = size
+    if width <= 0 or height <= 0:
+        return image
+
+    info = image.info
+    if getattr(image, 'tile', None):
+        try:
+            if image.draft(None, (width, height)) is not None:
+                return image
+        except Exception:
+            logger.warning('draft failed, decoding at full size: %s', info.get('filename'), exc_info=True)
+    else:
+        logger.debug('already loaded, cannot draft: %s', info.get('filename'))
+
+    if image.mode not in REDUCIBLE_MODES:
+        return image
+
+    image_width, image_height = image.size
+    factor = min(image_width // width, image_height // height)
+    if factor < 2:
+        return image
+
+    try:
+        reduced = image.reduce(factor)
+    except Exception:
+        logger.warning('reduce failed, resizing at full size: %s', info.get('filename'), exc_info=True)
+        return image
+    reduced.info.update(info)
+    return reduced
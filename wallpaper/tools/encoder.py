@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+from dataclasses import dataclass
+import hashlib
+import logging
+import os
+import time
+
+from PIL import Image
+
+from wallpaper.config import MonitorConfig
+from .perf import Counters
+
+logger = logging.getLogger(__name__)
+
+# Formats we write, with their usual extension. BMP and TIFF are written uncompressed, so cost little more than a copy
+Formats = {'JPEG': '.jpg', 'PNG': '.png', 'BMP': '.bmp', 'TIFF': '.tif', 'WEBP': '.webp'}
+
+
+@dataclass
+class EncodeResult:
+    path: str
+    written: bool
+    size: int
+    seconds: float
+    digest: str
+
+
+class Encoder:
+    """
+    Writes finished wallpapers. A digest of the pixels and settings is kept next to the file, so writing the same
+    wallpaper again (an unchanged refresh, or a daemon with nothing new to show) is skipped.
+
+    :param image_format: One of `Formats`, '' to go by the file's extension
+    :param quality: JPEG and WebP quality
+    :param subsampling: JPEG chroma subsampling, e.g. '4:2:0', '' for Pillow's default
+    :param optimize: Spend longer making JPEG and PNG files smaller
+    :param compress_level: PNG compression, 0 to 9
+    """
+
+    def __init__(self, image_format: str = '', quality: int = 90, subsampling: str = '', optimize: bool = False,
+                 compress_level: int = 6):
+        image_format = image_format.upper()
+        if image_format == 'JPG':
+            image_format = 'JPEG'
+        if image_format and image_format not in Formats:
+            raise ValueError(f'Unknown output format: {image_format}, expected one of {list(Formats)}')
+        self.image_format = image_format
+        self.quality = quality
+        self.subsampling = subsampling
+        self.optimize = optimize
+        self.compress_level = compress_level
+
+    @classmethod
+    def from_config(cls, config: MonitorConfig) -> 'Encoder':
+        return cls(config.output_format, config.output_quality, config.output_subsampling, config.output_optimize,
+                   config.output_compress_level)
+
+    def format_for(self, path: str) -> str:
+        if self.image_format:
+            return self.image_format
+        extension = os.path.splitext(path)[1].lower()
+        for image_format, format_extension in Formats.items():
+            if extension == format_extension:
+                return image_format
+        # The common formats are registered by preinit, only go looking through every plugin for the rest
+        Image.preinit()
+        return Image.EXTENSION.get(extension) or Image.registered_extensions().get(extension, 'JPEG')
+
+    def extension(self, default: str = '.jpg') -> str:
+        return Formats.get(self.image_format, default)
+
+    def params(self, image_format: str) -> dict:
+        if image_format == 'JPEG':
+            params = {'quality': self.quality, 'optimize': self.optimize}
+            if self.subsampling:
+                params['subsampling'] = self.subsampling
+            return params
+        if image_format == 'PNG':
+            return {'compress_level': self.compress_level, 'optimize': self.optimize}
+        if image_format == 'WEBP':
+            return {'quality': self.quality}
+        return {}
+
+    @staticmethod
+    def digest(image: Image.Image, image_format: str, params: dict) -> str:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(repr((image.mode, image.size, image_format, sorted(params.items()))).encode())
+        h.update(image.tobytes())
+        return h.hexdigest()
+
+    def write(self, image: Image.Image, path: str) -> EncodeResult:
+        """
+        Encode `image` to `path`, replacing it in one step so nothing reading it sees half a file.
+        If `path` is a symlink its target is replaced and the link kept.
+        """
+        start = time.perf_counter()
+        with Counters.timed('encode'):
+            image_format = self.format_for(path)
+            params = self.params(image_format)
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            digest = self.digest(image, image_format, params)
+            digest_path = f'{path}.digest'
+            try:
+                with open(digest_path, 'rt') as fp:
+                    unchanged = fp.read() == digest and os.path.exists(path)
+            except OSError:
+                unchanged = False
+            if unchanged:
+                Counters.count('encodes_skipped')
+            else:
+                target = os.path.realpath(path)
+                temp = f'{target}.tmp'
+                image.save(temp, image_format, **params)
+                os.replace(temp, target)
+                with open(digest_path, 'wt') as fp:
+                    fp.write(digest)
+        result = EncodeResult(path, not unchanged, os.path.getsize(path), time.perf_counter() - start, digest)
+        if result.written:
+            Counters.count('encoded_bytes', result.size)
+        logger.info('%s %s: %d bytes in %.3fs', 'Wrote' if result.written else 'Unchanged', path, result.size,
+                    result.seconds)
+        return result
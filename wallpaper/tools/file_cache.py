@@ -35,90 +35,185 @@ class _Cache(metaclass=ABCMeta):
 
 
 class SQL_Cache(_Cache):
-    CacheLock = threading.RLock()
-    CacheQueue = queue.Queue()
+    """
+    The directory catalogue in sqlite: each directory's mtime, image files and sub directories, so a run
+    starts warm.
 
-    def __init__(self):
-        self.dir_cache = {}
+    Reads use one connection per thread. Writes are queued to a single writer thread, which commits
+    whatever has queued up in one transaction. The database runs in WAL mode so reads don't wait on it.
+    """
+    CacheLock = threading.RLock()
+    BATCH_SIZE = 500
+    # modified_time of a directory we know exists but haven't listed
+    UNLISTED = -1.0
+
+    # Kept as constants so each connection's statement cache reuses the prepared statements
+    SELECT_DIRECTORY = 'SELECT modified_time FROM directories WHERE path = ?'
+    SELECT_FILES = 'SELECT filename FROM files WHERE directory = ?'
+    SELECT_SUBDIRS = 'SELECT path FROM directories WHERE parent = ? ORDER BY path'
+    UPSERT_DIRECTORY = ('INSERT INTO directories (path, modified_time) VALUES (?, ?) '
+                        'ON CONFLICT(path) DO UPDATE SET modified_time = excluded.modified_time')
+    UNLINK_SUBDIRS = 'UPDATE directories SET parent = NULL WHERE parent = ?'
+    LINK_SUBDIR = ('INSERT INTO directories (path, modified_time, parent) VALUES (?, ?, ?) '
+                   'ON CONFLICT(path) DO UPDATE SET parent = excluded.parent')
+    DELETE_FILES = 'DELETE FROM files WHERE directory = ?'
+    INSERT_FILE = 'INSERT OR IGNORE INTO files (directory, filename) VALUES (?, ?)'
+
+    def __init__(self, dircache_db: str = 'dircache.db'):
+        self.dircache_db = dircache_db
+        self.dir_cache: dict[str, DirEntry] = {}
         self.history = ImageHistory()
         self.changed = False
-        self.queue_thread = threading.Thread(target=self._set_db)
+        self._local = threading.local()
+        self._create_cache_table()
+        self.queue = queue.Queue()
+        self.queue_thread = threading.Thread(target=self._set_db, name='dircache-writer', daemon=True)
         self.queue_thread.start()
-        self._create_cache_db()
-
-    def _create_cache_db(self):
-        self.dircache_db = 'dircache.db'
-        if not osPath.exists(self.dircache_db):
-            self._create_cache_table()
 
     def _create_cache_table(self):
         db = self._db()
-        cursor = db.cursor()
-        cursor.executescript(
+        db.executescript(
             """
-            CREATE TABLE dir_entries (
+            CREATE TABLE IF NOT EXISTS directories (
+                path TEXT PRIMARY KEY,
+                modified_time REAL NOT NULL,
+                parent TEXT);
+            CREATE TABLE IF NOT EXISTS files (
                 directory TEXT NOT NULL,
-                file TEXT NOT NULL,
-                modified_time REAL NOT NULL 
-            );
-            CREATE INDEX dir_path ON dir_entries(directory);
+                filename TEXT NOT NULL,
+                PRIMARY KEY (directory, filename)) WITHOUT ROWID;
             """
         )
+        if 'parent' not in {r[1] for r in db.execute('PRAGMA table_info(directories)')}:
+            db.execute('ALTER TABLE directories ADD COLUMN parent TEXT')
+        db.execute('CREATE INDEX IF NOT EXISTS directories_parent ON directories(parent)')
         db.commit()
-        db.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.dircache_db, check_same_thread=False)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        return db
 
     def _db(self) -> sqlite3.Connection:
-        return sqlite3.connect(self.dircache_db)
+        """
+        This thread's connection
+        """
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = self._connect()
+        return db
 
     def count(self) -> int:
-        db = self._db()
-        cursor = db.cursor()
-        count = cursor.execute('SELECT COUNT(*) FROM dir_entries').fetchone()[0]
-        logging.error("Cache Entries: %d", count)
+        count = self._db().execute('SELECT COUNT(*) FROM files').fetchone()[0]
+        logging.info("Cache Entries: %d", count)
         return count
 
-    def get(self, path: str) -> str:
-        if path not in self.dir_cache:
-            db = self._db()
-            cursor = db.cursor()
-            cursor.execute('SELECT directory, modified_time FROM dir_entries WHERE directory = ?', (path,))
-            try:
-                r = cursor.fetchone()
-                if r:
-                    self.dir_cache[path] = DirEntry(r[0], stat=r[1])
-            except:
-                logging.exception("QUERY FAILED %s", path)
+    def _load(self, path: str) -> DirEntry | None:
+        db = self._db()
+        try:
+            r = db.execute(self.SELECT_DIRECTORY, (path,)).fetchone()
+            if not r or r[0] == self.UNLISTED:
+                return None
+            files = [osPath.join(path, f) for (f,) in db.execute(self.SELECT_FILES, (path,))]
+            subdirs = [d for (d,) in db.execute(self.SELECT_SUBDIRS, (path,))]
+            return DirEntry(path, files, stat=r[0], _subdirs=subdirs)
+        except sqlite3.Error:
+            logging.exception("QUERY FAILED %s", path)
+            return None
+
+    def lookup(self, path: str) -> DirEntry | None:
+        """
+        The recorded entry for a directory, without checking whether it's still current
+        """
+        entry = self.dir_cache.get(path)
+        if entry is None:
+            entry = self._load(path)
+            if entry is not None:
+                with self.CacheLock:
+                    entry = self.dir_cache.setdefault(path, entry)
+        return entry
+
+    def recorded(self, path: str) -> tuple[float, list[str]] | None:
+        """
+        The recorded mtime and sub directories of a directory, without loading its files
+        """
+        entry = self.dir_cache.get(path)
+        if entry is not None:
+            return entry.stat, entry.subdirs
+        db = self._db()
+        r = db.execute(self.SELECT_DIRECTORY, (path,)).fetchone()
+        if not r or r[0] == self.UNLISTED:
+            return None
+        return r[0], [d for (d,) in db.execute(self.SELECT_SUBDIRS, (path,))]
 
-        return self.dir_cache.get(path)
+    def get(self, path: str) -> DirEntry:
+        """
+        The catalogue entry for a directory, listing it again if it has changed since it was recorded
+        """
+        entry = self.lookup(path)
+        try:
+            modified_time = os.stat(path).st_mtime
+        except OSError:
+            modified_time = None
+        if entry is None or entry.stat != modified_time:
+            self.set(path, None, modified_time)
+        return self.dir_cache[path]
 
     def flush(self):
-        SQL_Cache.CacheQueue.put(None)
-        self.queue_thread.join()
+        """
+        Wait until everything queued so far is committed
+        """
+        self.queue.join()
 
     def update(self, path: str, files=None, stat=os.stat):
-        if self.get(path) and self.dir_cache[path].stat == int(stat(path).st_mtime):
+        entry = self.lookup(path)
+        modified_time = stat(path).st_mtime
+        if entry is not None and entry.stat == modified_time:
             return path
-        return self.set(path, files)
+        return self.set(path, files, modified_time)
 
     def _set_db(self):
-        db = self._db()
+        db = self._connect()
         while True:
-            entry = SQL_Cache.CacheQueue.get()
-            if entry is None:
-                db.commit()
-                db.close()
-                break
-            cursor = db.cursor()
-            cursor.execute(
-                """
-                INSERT OR REPLACE INTO dir_entries (modified_time, path) VALUES(?, ?) 
-                """, (entry.stat, entry.path)
-            )
-
-    def set(self, path: str, files: Sequence[str] | None):
-        entry = DirEntry(path, files)
-        self.dir_cache[path] = entry
-        self.CacheQueue.put(entry)
+            entries = [self.queue.get()]
+            while len(entries) < self.BATCH_SIZE:
+                try:
+                    entries.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with db:
+                    for entry in entries:
+                        db.execute(self.UPSERT_DIRECTORY, (entry.path, entry.stat))
+                        db.execute(self.DELETE_FILES, (entry.path,))
+                        db.executemany(self.INSERT_FILE, ((entry.path, osPath.basename(f)) for f in entry.files))
+                        db.execute(self.UNLINK_SUBDIRS, (entry.path,))
+                        db.executemany(self.LINK_SUBDIR, ((d, self.UNLISTED, entry.path) for d in entry.subdirs))
+            except sqlite3.Error:
+                logging.exception('Writing directory catalogue')
+            finally:
+                for _ in entries:
+                    self.queue.task_done()
+
+    def set(self, path: str, files: Sequence[str] | None, modified_time: float | None = None) -> str:
+        """
+        List a directory (unless `files` are given) and record it
+
+        :param modified_time: The directory's mtime, if the caller already has it
+        """
+        if modified_time is None:
+            try:
+                modified_time = os.stat(path).st_mtime
+            except OSError:
+                files = files or []
+        entry = DirEntry(path, files, stat=modified_time)
+        # List it now, on the caller's thread and outside the lock, so the writer has everything to store
+        entry.scan()
+        with self.CacheLock:
+            self.dir_cache[path] = entry
+        if modified_time is not None:
+            self.queue.put(entry)
         return path
 
 
@@ -185,4 +280,4 @@ class NullCache(_Cache):
         pass
 
 
-DirectoryCache = NullCache
+DirectoryCache = SQL_Cache
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+import functools
+
+from PIL import Image
+
+
+@functools.lru_cache(maxsize=4)
+def _gradient_column(height: int, top: tuple[int, int, int], bottom: tuple[int, int, int]) -> Image.Image:
+    bands = [Image.frombytes('L', (1, height), bytes(int(t + (b - t) * y / height) for y in range(height)))
+             for t, b in zip(top, bottom)]
+    bands.append(Image.new('L', (1, height), 255))
+    return Image.merge('RGBA', bands)
+
+
+@functools.lru_cache(maxsize=4)
+def _vertical_gradient(size: tuple[int, int], top: tuple[int, int, int], bottom: tuple[int, int, int]) -> Image.Image:
+    width, height = size
+    return _gradient_column(height, top, bottom).resize((width, height), Image.Resampling.NEAREST)
+
+
+def make_gradient(size: tuple[int, int], top: tuple[int, int, int], bottom: tuple[int, int, int]) -> Image.Image:
+    """
+    An opaque RGBA image fading from `top` to `bottom`.
+
+    Built as a one pixel wide column stretched across the width, and cached by size and colours, so
+    repeated renders of the same layout only pay for a copy.
+
+    :param size: (width, height)
+    :param top: RGB colour of the first row
+    :param bottom: RGB colour of the last row
+    """
+    return _vertical_gradient(tuple(size), tuple(top), tuple(bottom)).copy()
+
+
+def gradient_region(size: tuple[int, int], top: tuple[int, int, int], bottom: tuple[int, int, int],
+                    box: tuple[int, int, int, int]) -> Image.Image:
+    """
+    The `box` part of `make_gradient(size, top, bottom)`, without making the rest
+    """
+    _width, height = size
+    left, upper, right, lower = box
+    column = _gradient_column(height, tuple(top), tuple(bottom)).crop((0, upper, 1, lower))
+    return column.resize((right - left, lower - upper), Image.Resampling.NEAREST)
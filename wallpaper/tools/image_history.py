@@ -3,26 +3,37 @@ import io
 import logging
 import os
 import sqlite3
+import struct
 import threading
 import time
 from typing import Sequence
 
+from wallpaper.tools.bloom import BloomFilter
 from wallpaper.tools.decorators import locked
 
 logger = logging.getLogger(__name__)
 DB_PATH = 'priorwalls.db'
+BLOOM_PATH = 'priorwalls.bloom'
 
 osPath = os.path
 
 
 class SQL_ImageHistory:
+    """
+    Images we've used, in priorwalls.db. Each directory's history is only read when that directory is chosen.
+
+    A bloom filter of the directories with any history, kept next to the db, lets directories that have never
+    been used skip the query. It's tagged with the db's last rowid and rebuilt if the db has moved on without it.
+    """
+    CacheLock = threading.RLock()
 
     def __init__(self):
         self.count = 0
         self._setup_db()
-        self.priorWalls = self.load_walls()
+        # directory: full paths of the images used from it
+        self.directories: dict[str, set[str]] = {}
         self.newWalls = set()
-        self.count = 0
+        self.bloom = self.load_bloom()
 
     @staticmethod
     def _setup_db():
@@ -44,17 +55,66 @@ class SQL_ImageHistory:
                 db.close()
 
     @staticmethod
-    def load_walls() -> set[str]:
+    def _last_rowid(db: sqlite3.Connection) -> int:
+        return db.execute('SELECT COALESCE(MAX(rowid), 0) FROM dir_entries').fetchone()[0]
+
+    def load_bloom(self) -> BloomFilter | None:
+        """
+        The saved directory filter, or a new one built from the db if it's missing or out of date
+        """
         db = sqlite3.connect(DB_PATH)
-        cursor = db.cursor()
-        result = cursor.execute('SELECT directory, filename FROM dir_entries')
-        return {
-            os.path.join(r[0], r[1]) for r in result.fetchall()
-        }
+        try:
+            last_rowid = self._last_rowid(db)
+            try:
+                with open(BLOOM_PATH, 'rb') as f:
+                    data = f.read()
+                if struct.unpack_from('<q', data)[0] == last_rowid:
+                    return BloomFilter.from_bytes(data[8:])
+            except (OSError, ValueError, struct.error):
+                pass
+            return self._build_bloom(db, last_rowid)
+        finally:
+            db.close()
+
+    def _build_bloom(self, db: sqlite3.Connection, last_rowid: int) -> BloomFilter:
+        directories = [r[0] for r in db.execute('SELECT DISTINCT directory FROM dir_entries')]
+        bloom = BloomFilter(max(1000, len(directories) * 2))
+        for directory in directories:
+            bloom.add(directory)
+        self._save_bloom(bloom, last_rowid)
+        return bloom
 
+    @staticmethod
+    def _save_bloom(bloom: BloomFilter, last_rowid: int):
+        try:
+            with open(BLOOM_PATH + '.tmp', 'wb') as f:
+                f.write(struct.pack('<q', last_rowid) + bloom.to_bytes())
+            os.replace(BLOOM_PATH + '.tmp', BLOOM_PATH)
+        except OSError:
+            logger.exception('Saving %s', BLOOM_PATH)
+
+    @locked(CacheLock)
+    def seen(self, directory: str) -> set[str]:
+        """
+        The images used from a directory
+        """
+        walls = self.directories.get(directory)
+        if walls is None:
+            walls = set()
+            if directory in self.bloom:
+                db = sqlite3.connect(DB_PATH)
+                try:
+                    walls = {osPath.join(directory, r[0]) for r in
+                             db.execute('SELECT filename FROM dir_entries WHERE directory = ?', (directory,))}
+                finally:
+                    db.close()
+            self.directories[directory] = walls
+        return walls
+
+    @locked(CacheLock)
     def remove_walls(self, walls: Sequence):
-        self.priorWalls -= set(walls)
         path = os.path.dirname(walls[0])
+        self.seen(path).difference_update(walls)
         logging.info("DELETING :-) %s", path)
         db = sqlite3.connect(DB_PATH)
         cursor = db.cursor()
@@ -63,26 +123,43 @@ class SQL_ImageHistory:
             'DELETE FROM dir_entries where directory = ? and last_used < ?', (path, yesterday)
         )
         db.commit()
+        db.close()
 
+    @locked(CacheLock)
     def add_wall(self, wall: str):
-        if wall not in self.priorWalls:
+        walls = self.seen(osPath.dirname(wall))
+        if wall not in walls:
             self.newWalls.add(wall)
-        self.priorWalls.add(wall)
+        walls.add(wall)
 
+    @locked(CacheLock)
     def write_walls(self):
+        if not self.newWalls or self.count:
+            return
         db = sqlite3.connect(DB_PATH)
-        cursor = db.cursor()
-        if self.newWalls and not self.count:
-            cursor.executemany(
-                "INSERT INTO dir_entries(directory, filename, last_used) VALUES (?, ?, strftime('%s', 'now'))",
-                [os.path.split(wall) for wall in self.newWalls]
+        try:
+            rows = [os.path.split(wall) for wall in self.newWalls]
+            db.executemany(
+                "INSERT INTO dir_entries(directory, filename, last_used) VALUES (?, ?, strftime('%s', 'now'))", rows
             )
             db.commit()
+            # Written, so the next flush doesn't insert them again
+            self.newWalls = set()
+            for directory, _filename in rows:
+                self.bloom.add(directory)
+            if self.bloom.full:
+                self.bloom = self._build_bloom(db, self._last_rowid(db))
+            else:
+                self._save_bloom(self.bloom, self._last_rowid(db))
+        finally:
+            db.close()
 
     def get_available(self, files: Sequence[str], dontWant=None):
         if dontWant is None:
             dontWant = set()
-        return list(set(files) - self.priorWalls - dontWant)
+        prior = set().union(*(self.seen(d) for d in {osPath.dirname(f) for f in files}))
+        # Sorted, so that a seeded run picks the same files regardless of hash ordering
+        return sorted(set(files) - prior - dontWant)
 
     def bump(self):
         self.count += 1
@@ -138,7 +215,8 @@ class FileImageHistory:
     def get_available(self, files: Sequence[str], dontWant=None):
         if dontWant is None:
             dontWant = set()
-        return list(set(files) - self.priorWalls - dontWant)
+        # Sorted, so that a seeded run picks the same files regardless of hash ordering
+        return sorted(set(files) - self.priorWalls - dontWant)
 
     @locked(CacheLock)
     def bump(self):
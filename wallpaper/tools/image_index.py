@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+from dataclasses import dataclass
+import logging
+import math
+import os
+import sqlite3
+import threading
+from typing import Sequence
+
+from PIL import Image
+
+from wallpaper.tools.decorators import locked
+
+logger = logging.getLogger(__name__)
+DB_PATH = 'imageindex.db'
+# Aspect ratio buckets per doubling of width / height, and how far from the target bucket we'll look
+BUCKETS_PER_OCTAVE = 4
+MAX_BUCKET_DISTANCE = 2
+
+osPath = os.path
+
+
+@dataclass
+class ImageInfo:
+    width: int = 0
+    height: int = 0
+    mode: str = ''
+    has_alpha: bool = False
+    format: str = ''
+    readable: bool = True
+    # The file's modification time and size when it was recorded
+    mtime: float = 0.0
+    size: int = 0
+
+    @property
+    def pixels(self) -> int:
+        return self.width * self.height
+
+    @property
+    def aspect(self) -> float:
+        return self.width / self.height if self.height else 0.0
+
+    @property
+    def bucket(self) -> int | None:
+        if not (self.readable and self.width and self.height):
+            return None
+        return aspect_bucket(self.aspect)
+
+
+def aspect_bucket(aspect: float) -> int:
+    return round(math.log2(aspect) * BUCKETS_PER_OCTAVE)
+
+
+class ImageIndex:
+    """
+    Header metadata for every image we've opened, so unsuitable candidates can be skipped without touching them.
+
+    Records are loaded a directory at a time and new records are written on `flush`. Each record keeps the
+    file's modification time and size, and is dropped the first time it's looked up in a run if the file has
+    changed since.
+    """
+    CacheLock = threading.RLock()
+
+    def __init__(self):
+        self.directories: dict[str, dict[str, ImageInfo]] = {}
+        self.buckets: dict[str, dict[int, set[str]]] = {}
+        self.pending: dict[str, ImageInfo] = {}
+        # Files whose records have been checked against the file this run
+        self.checked: set[str] = set()
+        self._setup_db()
+
+    @staticmethod
+    def _setup_db():
+        db = sqlite3.connect(DB_PATH)
+        try:
+            db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS images (
+                    directory TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    width INTEGER NOT NULL,
+                    height INTEGER NOT NULL,
+                    mode TEXT NOT NULL,
+                    has_alpha INTEGER NOT NULL,
+                    format TEXT NOT NULL,
+                    readable INTEGER NOT NULL,
+                    mtime REAL NOT NULL DEFAULT 0,
+                    size INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (directory, filename));
+                """
+            )
+            # Indexes from before records were keyed by mtime and size. Their records never match, so are redone
+            columns = {row[1] for row in db.execute('PRAGMA table_info(images)')}
+            for column, definition in (('mtime', 'REAL NOT NULL DEFAULT 0'), ('size', 'INTEGER NOT NULL DEFAULT 0')):
+                if column not in columns:
+                    db.execute(f'ALTER TABLE images ADD COLUMN {column} {definition}')
+        finally:
+            db.commit()
+            db.close()
+
+    @locked(CacheLock)
+    def get(self, directory: str) -> dict[str, ImageInfo]:
+        """
+        All known images in a directory, keyed by full path
+        """
+        if directory not in self.directories:
+            db = sqlite3.connect(DB_PATH)
+            try:
+                rows = db.execute(
+                    'SELECT filename, width, height, mode, has_alpha, format, readable, mtime, size FROM images '
+                    'WHERE directory = ?', (directory,)
+                ).fetchall()
+            finally:
+                db.close()
+            self.directories[directory] = {}
+            self.buckets[directory] = {}
+            for r in rows:
+                self._add(directory, osPath.join(directory, r[0]),
+                          ImageInfo(r[1], r[2], r[3], bool(r[4]), r[5], bool(r[6]), r[7], r[8]))
+        return self.directories[directory]
+
+    def _add(self, directory: str, filename: str, info: ImageInfo):
+        buckets = self.buckets[directory]
+        previous = self.directories[directory].get(filename)
+        if previous is not None and previous.bucket is not None:
+            buckets[previous.bucket].discard(filename)
+        self.directories[directory][filename] = info
+        if info.bucket is not None:
+            buckets.setdefault(info.bucket, set()).add(filename)
+
+    def _forget(self, directory: str, filename: str):
+        info = self.directories[directory].pop(filename)
+        if info.bucket is not None:
+            self.buckets[directory][info.bucket].discard(filename)
+
+    @locked(CacheLock)
+    def lookup(self, filename: str) -> ImageInfo | None:
+        """
+        The record for a file, None if there isn't one or the file has changed since it was made
+        """
+        directory = osPath.dirname(filename)
+        info = self.get(directory).get(filename)
+        if info is None or filename in self.checked:
+            return info
+        try:
+            st = os.stat(filename)
+        except OSError:
+            # Can't tell, opening it will
+            return info
+        self.checked.add(filename)
+        if (st.st_mtime, st.st_size) != (info.mtime, info.size):
+            self._forget(directory, filename)
+            return None
+        return info
+
+    @locked(CacheLock)
+    def _set(self, filename: str, info: ImageInfo):
+        try:
+            st = os.stat(filename)
+        except OSError:
+            return
+        info.mtime, info.size = st.st_mtime, st.st_size
+        directory = osPath.dirname(filename)
+        self.checked.add(filename)
+        if self.get(directory).get(filename) != info:
+            self._add(directory, filename, info)
+            self.pending[filename] = info
+
+    def record(self, filename: str, image: Image.Image):
+        """
+        Remember the header of a freshly opened image
+        """
+        has_alpha = 'A' in image.mode or 'transparency' in image.info
+        self._set(filename, ImageInfo(image.width, image.height, image.mode, has_alpha, image.format or '', True))
+
+    def record_unreadable(self, filename: str):
+        """
+        Remember that a file isn't an image we can open, until it changes
+        """
+        self._set(filename, ImageInfo(readable=False))
+
+    def is_suitable(self, filename: str, min_pixels: int = 0) -> bool:
+        info = self.lookup(filename)
+        return info is None or (info.readable and info.pixels >= min_pixels)
+
+    def suitable(self, files: Sequence[str], min_pixels: int = 0) -> list[str]:
+        """
+        Drop files known to be unreadable or smaller than `min_pixels`. Unknown files are kept.
+        """
+        return [filename for filename in files if self.is_suitable(filename, min_pixels)]
+
+    @locked(CacheLock)
+    def closest_aspect(self, files: Sequence[str], aspect: float) -> list[str]:
+        """
+        Narrow `files` to the known images whose aspect ratio is nearest to `aspect`, and the unknown images,
+        so new images still get a chance (and get indexed).
+
+        If nothing known is within `MAX_BUCKET_DISTANCE` buckets, all of `files` are returned.
+        """
+        if not files or aspect <= 0:
+            return list(files)
+        target = aspect_bucket(aspect)
+        wanted = set(files)
+        known: set[str] = set()
+        buckets: dict[int, set[str]] = {}
+        for directory in {osPath.dirname(f) for f in files}:
+            known.update(self.get(directory))
+            for bucket, names in self.buckets[directory].items():
+                buckets.setdefault(bucket, set()).update(names)
+
+        for distance in range(MAX_BUCKET_DISTANCE + 1):
+            found = set()
+            for bucket in {target - distance, target + distance}:
+                found.update(buckets.get(bucket, set()) & wanted)
+            if found:
+                return [filename for filename in files if filename in found or filename not in known]
+        return list(files)
+
+    @locked(CacheLock)
+    def flush(self):
+        if not self.pending:
+            return
+        db = sqlite3.connect(DB_PATH)
+        try:
+            db.executemany(
+                'INSERT OR REPLACE INTO images (directory, filename, width, height, mode, has_alpha, format, readable, '
+                'mtime, size) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(*osPath.split(f), i.width, i.height, i.mode, i.has_alpha, i.format, i.readable, i.mtime, i.size)
+                 for f, i in self.pending.items()]
+            )
+            db.commit()
+        finally:
+            db.close()
+        self.pending = {}
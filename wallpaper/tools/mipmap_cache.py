@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import logging
+import os
+
+from PIL import Image
+
+from wallpaper.tools.disk_cache import DiskCache
+from wallpaper.tools.draft_image import draft_image
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = 'mipmaps'
+# Power of two reductions kept for each source, 1/2 to 1/16
+LEVELS = (1, 2, 3, 4)
+# Don't bother caching levels smaller than this
+MIN_LEVEL_SIZE = 64
+
+Mipmaps: 'MipmapCache | None' = None
+
+
+def configure(budget_mb: int):
+    """
+    Set up (or disable, with a zero budget) the shared mipmap cache
+    """
+    global Mipmaps
+    if budget_mb <= 0:
+        Mipmaps = None
+    elif Mipmaps is None:
+        Mipmaps = MipmapCache(CACHE_PATH, budget_mb * 2 ** 20)
+    else:
+        Mipmaps.cache.budget = budget_mb * 2 ** 20
+
+
+def source_key(filename: str) -> str | None:
+    """
+    Content address for a source image, from its path, size and modification time
+    """
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return None
+    return hashlib.sha1(f'{filename}|{st.st_size}|{st.st_mtime_ns}'.encode('utf-8')).hexdigest()
+
+
+class MipmapCache:
+    """
+    Pre-downscaled copies of source images at a few power of two levels, so repeat renders
+    read a small local file instead of decoding the original.
+
+    :param root: Directory for the cache
+    :param budget: Byte budget for the cache
+    """
+    def __init__(self, root: str, budget: int):
+        self.cache = DiskCache(root, budget)
+
+    def open(self, filename: str, size: tuple[int, int]) -> Image.Image | None:
+        """
+        Open the smallest cached level that covers `size`
+
+        :param filename: The source image
+        :param size: The target size
+        """
+        key = source_key(filename)
+        if not key:
+            return None
+        path = self.cache.find(f'{key}_', size)
+        if not path:
+            return None
+        image = Image.open(path)
+        image.info['filename'] = filename
+        image.info['mipmap'] = str(path)
+        return image
+
+    def store(self, filename: str, original_size: tuple[int, int], image: Image.Image):
+        """
+        Store every level that can be made from the decoded `image`
+
+        :param filename: The source image
+        :param original_size: The size of the source image, before any draft
+        :param image: The decoded (possibly drafted) image
+        """
+        key = source_key(filename)
+        if not key:
+            return
+        width, height = original_size
+        for level in LEVELS:
+            level_size = (width >> level, height >> level)
+            if min(level_size) < MIN_LEVEL_SIZE:
+                break
+            if level_size[0] > image.width or level_size[1] > image.height:
+                continue
+            if image.size != level_size:
+                image = image.resize(level_size, Image.Resampling.BOX)
+            try:
+                self.cache.put(f'{key}_{level}', image)
+            except OSError:
+                logger.exception('Cannot cache %s', filename)
+                return
+
+
+def open_image(filename: str, size: tuple[int, int] | None = None) -> Image.Image:
+    """
+    Open an image, preferring a cached level that covers `size`
+
+    :param filename: The source image
+    :param size: The target size, if known
+    """
+    if Mipmaps and size:
+        try:
+            image = Mipmaps.open(filename, size)
+        except Exception as e:
+            # A damaged cache entry says nothing about the source
+            logger.warning('Cached level of %s: %s', filename, e)
+            image = None
+        if image:
+            return image
+    image = Image.open(filename)
+    image.info['filename'] = filename
+    return image
+
+
+def load_image(image: Image.Image, size: tuple[int, int]) -> Image.Image:
+    """
+    Get a decoded image suitable for resizing to `size`.
+
+    Uses the smallest cached level that covers `size`, otherwise drafts and decodes the source and
+    fills the cache from the result.
+
+    :param image: An opened image, possibly already a cached level
+    :param size: The final size
+    """
+    filename = image.info.get('filename')
+    if not Mipmaps or not filename or 'mipmap' in image.info:
+        return draft_image(image, size)
+
+    cached = Mipmaps.open(filename, size)
+    if cached:
+        image.close()
+        return draft_image(cached, size)
+
+    original_size = image.size
+    image = draft_image(image, size)
+    image.load()
+    Mipmaps.store(filename, original_size, image)
+    return image
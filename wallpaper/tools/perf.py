@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+from collections import Counter, defaultdict
+import contextlib
+import threading
+import time
+
+
+class PerfCounters:
+    """
+    Process wide stage timings and event counts, cheap enough to leave switched on.
+
+    Stages running on several threads at once add up, so a stage can total more than the wall time.
+    Work done in render worker processes isn't counted.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.times: dict[str, float] = defaultdict(float)
+        self.calls: Counter = Counter()
+        self.counts: Counter = Counter()
+        self.peaks: dict[str, int] = {}
+
+    @contextlib.contextmanager
+    def timed(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.times[stage] += elapsed
+                self.calls[stage] += 1
+
+    def count(self, name: str, n: int = 1):
+        with self.lock:
+            self.counts[name] += n
+
+    def peak(self, name: str, value: int):
+        """
+        Keep the highest `value` seen for `name`
+        """
+        with self.lock:
+            self.peaks[name] = max(self.peaks.get(name, value), value)
+
+    def reset(self):
+        with self.lock:
+            self.times.clear()
+            self.calls.clear()
+            self.counts.clear()
+            self.peaks.clear()
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                'stages': {stage: {'seconds': seconds, 'calls': self.calls[stage]}
+                           for stage, seconds in self.times.items()},
+                'counts': dict(self.counts),
+                'peaks': dict(self.peaks),
+            }
+
+
+Counters = PerfCounters()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import io
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+def read_ahead(image: Image.Image) -> Image.Image:
+    """
+    Pull an opened image's file into memory, so decoding it later never waits on the disk or network.
+
+    :param image: An opened, not yet loaded, image with `info['filename']`
+    :return: The same image, now backed by an in memory buffer
+    """
+    filename = image.info.get('filename')
+    path = image.info.get('mipmap', filename)
+    if not path:
+        return image
+    with open(path, 'rb') as fp:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fp.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+        data = fp.read()
+    info = image.info
+    image.close()
+    image = Image.open(io.BytesIO(data))
+    image.info.update(info)
+    return image
+
+
+class Prefetcher:
+    """
+    Select and read candidate images ahead of the placement loop on a background thread.
+
+    :param produce: Returns the next candidate image, or None when there are no more
+    :param depth: How many candidates to keep ready
+    """
+    def __init__(self, produce: Callable[[], Image.Image | None], depth: int):
+        self.produce = produce
+        self.queue = queue.Queue(maxsize=depth)
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.gets = 0
+        self.waits = 0
+        self.wait_time = 0.0
+
+    def start(self) -> 'Prefetcher':
+        self.thread.start()
+        return self
+
+    def _put(self, item: Image.Image | None) -> bool:
+        while not self.stopping.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _run(self):
+        while not self.stopping.is_set():
+            try:
+                image = self.produce()
+                if image is not None:
+                    image = read_ahead(image)
+            except Exception:
+                logger.exception('Prefetch failed')
+                image = None
+            if not self._put(image) or image is None:
+                return
+
+    def get(self) -> Image.Image | None:
+        """
+        The next candidate, blocking until one is ready. None once the producer has run dry.
+        """
+        self.gets += 1
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            pass
+        self.waits += 1
+        start = time.perf_counter()
+        try:
+            while True:
+                try:
+                    return self.queue.get(timeout=0.1)
+                except queue.Empty:
+                    if not self.thread.is_alive():
+                        try:
+                            return self.queue.get_nowait()
+                        except queue.Empty:
+                            return None
+        finally:
+            self.wait_time += time.perf_counter() - start
+
+    def close(self):
+        """
+        Stop the producer and release anything it had queued
+        """
+        self.stopping.set()
+        self.thread.join()
+        while True:
+            try:
+                image = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if image is not None:
+                image.close()
+        logger.info('Prefetch: %d gets, %d waits, %.3fs waiting', self.gets, self.waits, self.wait_time)
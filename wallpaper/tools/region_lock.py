@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import contextlib
+import threading
+from typing import Iterator
+
+Box = tuple[int, int, int, int]
+
+
+def overlaps(a: Box, b: Box) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+class RegionLock:
+    """
+    Locks rectangles of an image rather than the whole image.
+
+    Holders of non-overlapping boxes (or boxes on different images) run concurrently, a holder
+    of an overlapping box waits until the conflicting regions are released.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._held: list[tuple[int, Box]] = []
+
+    def _free(self, key: int, box: Box) -> bool:
+        return not any(k == key and overlaps(box, b) for k, b in self._held)
+
+    @contextlib.contextmanager
+    def hold(self, image, box: Box) -> Iterator[None]:
+        """
+        Hold `box` (left, top, right, bottom) of `image` for the duration of the block
+        """
+        entry = (id(image), tuple(box))
+        with self._condition:
+            self._condition.wait_for(lambda: self._free(*entry))
+            self._held.append(entry)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._held.remove(entry)
+                self._condition.notify_all()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import collections
+import hashlib
+import logging
+import threading
+
+from PIL import Image
+
+from wallpaper.tools.decorators import locked
+from wallpaper.tools.disk_cache import DiskCache
+from wallpaper.tools.mipmap_cache import source_key
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = 'tiles'
+
+Tiles: 'TileCache | None' = None
+
+
+def configure(memory_mb: int, disk_mb: int):
+    """
+    Set up (or disable, with zero budgets) the shared cache of finished tiles
+    """
+    global Tiles
+    if memory_mb <= 0 and disk_mb <= 0:
+        Tiles = None
+    elif Tiles is None or (Tiles.memory_budget, Tiles.disk_budget) != (memory_mb * 2 ** 20, disk_mb * 2 ** 20):
+        Tiles = TileCache(memory_mb * 2 ** 20, disk_mb * 2 ** 20)
+
+
+def tile_key(image: Image.Image, size: tuple[int, int], sizer, chain, monitor, position) -> str | None:
+    """
+    Cache key for an image resized to `size` with `sizer` and run through `chain`.
+    None when the result can't be cached: no source file, or a non-deterministic filter.
+    """
+    filename = image.info.get('filename')
+    if not filename or not chain.deterministic:
+        return None
+    source = source_key(filename)
+    if not source:
+        return None
+    parts = [source, str(tuple(size)), str(sizer), repr(chain.names)]
+    if chain.uses_position:
+        parts += [str(tuple(position)), str(tuple(monitor.size) if monitor else None)]
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+class TileCache:
+    """
+    Resized and filtered tiles, kept in memory and optionally on disk, each bounded by a byte budget.
+
+    :param memory_budget: Bytes of decoded tiles to hold in memory
+    :param disk_budget: Bytes of encoded tiles to keep on disk
+    """
+    CacheLock = threading.RLock()
+
+    def __init__(self, memory_budget: int, disk_budget: int):
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self.memory: collections.OrderedDict[str, Image.Image] = collections.OrderedDict()
+        self.memory_bytes = 0
+        self.disk = DiskCache(CACHE_PATH, disk_budget) if disk_budget > 0 else None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _bytes(image: Image.Image) -> int:
+        return image.width * image.height * len(image.getbands())
+
+    @locked(CacheLock)
+    def _remember(self, key: str, image: Image.Image):
+        size = self._bytes(image)
+        if size > self.memory_budget:
+            return
+        if key in self.memory:
+            self.memory_bytes -= self._bytes(self.memory.pop(key))
+        self.memory[key] = image
+        self.memory_bytes += size
+        while self.memory_bytes > self.memory_budget:
+            _key, old = self.memory.popitem(last=False)
+            self.memory_bytes -= self._bytes(old)
+
+    def get(self, key: str) -> Image.Image | None:
+        with self.CacheLock:
+            image = self.memory.get(key)
+            if image is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return image.copy()
+        if self.disk:
+            path = self.disk.find(key, (0, 0))
+            if path:
+                with Image.open(path) as cached:
+                    image = cached.convert('RGBA') if cached.mode == 'P' else cached.copy()
+                self._remember(key, image)
+                with self.CacheLock:
+                    self.hits += 1
+                return image.copy()
+        with self.CacheLock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, image: Image.Image):
+        self._remember(key, image.copy())
+        if self.disk:
+            try:
+                self.disk.put(key, image, lossless=True)
+            except OSError:
+                logger.exception('Cannot cache tile')
+
+    def stats(self) -> dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'memory_bytes': self.memory_bytes,
+                'disk_bytes': self.disk.total if self.disk else 0}
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import random
+from typing import Callable, Iterable
+
+
+class UnseenPool:
+    """
+    A set with O(1) add, discard and random draw: an array of items plus each item's index in it.
+    Discarding swaps the last item into the hole.
+    """
+
+    def __init__(self, items: Iterable[str] = ()):
+        self.items: list[str] = []
+        self.index: dict[str, int] = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, item: str):
+        if item not in self.index:
+            self.index[item] = len(self.items)
+            self.items.append(item)
+
+    def discard(self, item: str):
+        i = self.index.pop(item, None)
+        if i is None:
+            return
+        last = self.items.pop()
+        if i < len(self.items):
+            self.items[i] = last
+            self.index[last] = i
+
+    def draw(self, rng: random.Random = random) -> str | None:
+        """
+        A random item, left in the pool
+        """
+        return self.items[rng.randrange(len(self.items))] if self.items else None
+
+    def __contains__(self, item: str) -> bool:
+        return item in self.index
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+class DirectoryPool:
+    """
+    The unseen images of one directory, also split into pools by aspect ratio bucket, so a draw near an aspect
+    ratio costs the same however large the directory is.
+
+    :param unseen: The directory's images that haven't been used, in a stable order
+    :param bucket_of: The known aspect bucket of an image, or None
+    """
+
+    def __init__(self, unseen: Iterable[str], bucket_of: Callable[[str], int | None]):
+        self.all = UnseenPool(unseen)
+        self.buckets: dict[int, UnseenPool] = {}
+        self.bucket: dict[str, int] = {}
+        # Images not indexed yet, which could be any aspect ratio
+        self.unknown = UnseenPool()
+        for filename in self.all.items:
+            bucket = bucket_of(filename)
+            if bucket is not None:
+                self.bucket[filename] = bucket
+                self.buckets.setdefault(bucket, UnseenPool()).add(filename)
+            else:
+                self.unknown.add(filename)
+
+    def discard(self, filename: str):
+        self.all.discard(filename)
+        bucket = self.bucket.pop(filename, None)
+        if bucket is not None:
+            self.buckets[bucket].discard(filename)
+        else:
+            self.unknown.discard(filename)
+
+    def draw(self, rng: random.Random = random, target: int | None = None, max_distance: int = 0) -> str | None:
+        """
+        A random unseen image. With a `target` bucket, from the nearest non empty known buckets within
+        `max_distance` and the unknown images, falling back to any unseen image.
+        """
+        if target is not None:
+            for distance in range(max_distance + 1):
+                pools = [p for p in (self.buckets.get(b) for b in sorted({target - distance, target + distance}))
+                         if p]
+                if pools:
+                    pools.append(self.unknown)
+                total = sum(len(p) for p in pools)
+                if total:
+                    i = rng.randrange(total)
+                    for pool in pools:
+                        if i < len(pool):
+                            return pool.items[i]
+                        i -= len(pool)
+        return self.all.draw(rng)
+
+    def __len__(self) -> int:
+        return len(self.all)